@@ -1,8 +1,11 @@
-from flask import Flask, render_template
+from flask import Flask, Response, jsonify, render_template, request
+from werkzeug.exceptions import RequestEntityTooLarge
 from pathlib import Path
+import importlib
 import sys
 import os
 import signal
+import multiprocessing
 import threading
 import webbrowser
 
@@ -21,75 +24,250 @@ import backend.pdf.routes as pdf_routes
 import backend.image.routes as image_routes
 import backend.todo.routes as todo_routes
 import backend.video.routes as video_routes
-
-# Ensure runtime directories exist
-DATA_DIR.mkdir(exist_ok=True)
-TEMP_DIR.mkdir(exist_ok=True)
+from backend.utils.lifecycle import stopping
+from backend.utils.metrics import SHARE_DIR as METRICS_SHARE_DIR, metrics, track_requests
+from backend.utils.result_cache import result_cache
+from backend.utils.temp_workspace import TempQuotaExceeded, temp_workspaces
+from backend.utils.uploads import UploadRequest
+from backend.todo import storage as todo_storage
 
 # -----------------------------
-# Flask app
+# Errors
 # -----------------------------
 
-app = Flask(
-    __name__,
-    template_folder=BASE_DIR / "templates",
-    static_folder=BASE_DIR / "static",
-)
+def upload_too_large(e):
+    limit = request.max_content_length
+    message = "Upload too large"
+    if limit:
+        message += f" (limit: {limit / 1024 ** 2:.1f} MB)"
+    return jsonify({"error": message}), 413
 
-# -----------------------------
-# Register blueprints
-# -----------------------------
-app.register_blueprint(pdf_routes.pdf_bp)      # PDF processing blueprint
-app.register_blueprint(image_routes.image_bp)  # Image processing blueprint
-app.register_blueprint(todo_routes.todo_bp)    # To do processing blueprint
-app.register_blueprint(video_routes.video_bp)  # Video processing blueprint
+
+def temp_quota_exceeded(e):
+    # Back-pressure: the client should retry once other jobs are done
+    response = jsonify({"error": str(e)})
+    response.headers["Retry-After"] = "30"
+    return response, 503
 
 # -----------------------------
 # Routes
 # -----------------------------
 
-@app.route("/")
 def index():
     return render_template("index.html")
 
-@app.route("/todo")
 def todo():
     return render_template("todo.html")
 
-@app.route("/pdf-tools")
 def pdf_tools():
     return render_template("pdf_tools.html")
 
-@app.route("/image-tools")
 def image_tools():
     return render_template("image_tools.html")
 
-@app.route("/video-tools")
 def video_tools():
     return render_template("video_tools.html")
 
+# -----------------------------
+# Warm-up
+# -----------------------------
+
+# Tool modules the routes import on first use: the pages are served
+# without waiting for them, then they are loaded in the background
+WARM_UP_MODULES = (
+    "backend.pdf.service",
+    "backend.image.resize_service",
+    "backend.image.filter_service",
+    "moviepy.editor",
+)
+
+# Seconds to wait for the first request before warming up anyway
+WARM_UP_DELAY = 5
+
+_first_request_done = threading.Event()
+
+
+def _mark_first_request(exc):
+    _first_request_done.set()
+
+
+def warm_up():
+    _first_request_done.wait(WARM_UP_DELAY)
+    for name in WARM_UP_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            # The route will report the problem when the tool is used
+            print(f"Warning: could not preload {name}: {e}")
+
+
+def start_warm_up(app):
+    """Start warm_up in a background thread (unless disabled with WARM_UP=0)."""
+    if app.config["WARM_UP"]:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+# -----------------------------
+# Server control
+# -----------------------------
+
+def _server_master():
+    """PID of the pre-fork master (scripts/run_local.py), None under the dev server."""
+    pid = os.environ.get("WORKBENCH_SERVER_PID")
+    return int(pid) if pid else None
+
+
+def _from_this_machine():
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+
 # Route to shut down the server when using without console
-@app.route("/shutdown", methods=["POST"])
 def shutdown():
-    os.kill(os.getpid(), signal.SIGINT)
+    if not _from_this_machine():
+        return "Forbidden", 403
+
+    master = _server_master()
+    if master is None:
+        # Let open event streams end first
+        stopping.set()
+        os.kill(os.getpid(), signal.SIGINT)
+    else:
+        # Graceful: in-flight requests finish before the workers exit
+        os.kill(master, signal.SIGTERM)
     return "Shutting down..."
 
+
+# Replace the worker processes without dropping requests (pre-fork only)
+def restart():
+    if not _from_this_machine():
+        return "Forbidden", 403
+
+    master = _server_master()
+    if master is None:
+        return "Restart needs the pre-fork server (scripts/run_local.py)", 409
+
+    # New workers load the current code and config; old ones finish first
+    os.kill(master, signal.SIGHUP)
+    return "Restarting..."
+
+# -----------------------------
+# Metrics
+# -----------------------------
+
+# Prometheus text format
+def metrics_route():
+    temp = temp_workspaces.stats()
+    cache = result_cache.stats()
+
+    body = metrics.render({
+        "workbench_temp_bytes": ("Bytes used by request work directories", temp["bytes"]),
+        "workbench_temp_quota_bytes": ("Work directory quota (0 = none)", temp["quota_bytes"]),
+        "workbench_temp_ram_bytes": ("Bytes used by RAM-backed work directories", temp["ram_bytes"]),
+        "workbench_result_cache_bytes": ("Bytes used by the result cache", cache["bytes"]),
+        "workbench_result_cache_entries": ("Entries in the result cache", cache["entries"]),
+    })
+    return Response(body, content_type="text/plain; version=0.0.4; charset=utf-8")
+
 # -----------------------------
 # Browser launcher
 # -----------------------------
 
-def open_browser():
-    webbrowser.open("http://127.0.0.1:5000")
+def open_browser(app):
+    webbrowser.open(f"http://127.0.0.1:{app.config['PORT']}")
+
+# -----------------------------
+# App factory
+# -----------------------------
+
+def create_app():
+    """
+    Build the Flask app and configure the shared services from its
+    config (storage, work dirs, cache, metrics).
+
+    Nothing of this runs on import: process pool workers are spawned,
+    and under `python app/app.py` each of them imports this module again
+    (as __mp_main__) just to reach the job functions.
+    """
+    # Ensure runtime directories exist
+    DATA_DIR.mkdir(exist_ok=True)
+    TEMP_DIR.mkdir(exist_ok=True)
+
+    app = Flask(
+        __name__,
+        template_folder=BASE_DIR / "templates",
+        static_folder=BASE_DIR / "static",
+    )
+
+    # Uploads are spooled straight into request work dirs (see uploads.py)
+    app.request_class = UploadRequest
+
+    # Per-route timing, bytes in/out and requests in flight (see /metrics)
+    track_requests(app)
+
+    # App-level settings (see config.py)
+    app.config.from_pyfile(BASE_DIR / "config.py")
+    result_cache.max_bytes = app.config["CACHE_MAX_BYTES"]
+    todo_storage.configure(
+        mode=app.config["TODO_STORAGE"],
+        compact_threshold=app.config["TODO_JOURNAL_COMPACT_THRESHOLD"],
+        user=app.config["TODO_USER"],
+    )
+    temp_workspaces.configure(
+        quota_bytes=app.config["TEMP_QUOTA_BYTES"],
+        quota_wait=app.config["TEMP_QUOTA_WAIT"],
+        max_age=app.config["TEMP_MAX_AGE"],
+        ram_dir=app.config["TEMP_RAM_DIR"],
+        ram_job_bytes=app.config["TEMP_RAM_JOB_BYTES"],
+        ram_quota_bytes=app.config["TEMP_RAM_QUOTA_BYTES"],
+    )
+
+    # Remove work dirs a previous run left behind, then keep sweeping
+    temp_workspaces.start_sweeper(app.config["TEMP_SWEEP_INTERVAL"])
+
+    # Pre-fork workers each count their own requests: share them, so any
+    # worker answering /metrics reports the whole server
+    if _server_master() is not None:
+        metrics.share(METRICS_SHARE_DIR)
+
+    # Blueprints
+    app.register_blueprint(pdf_routes.pdf_bp)      # PDF processing blueprint
+    app.register_blueprint(image_routes.image_bp)  # Image processing blueprint
+    app.register_blueprint(todo_routes.todo_bp)    # To do processing blueprint
+    app.register_blueprint(video_routes.video_bp)  # Video processing blueprint
+
+    app.register_error_handler(RequestEntityTooLarge, upload_too_large)
+    app.register_error_handler(TempQuotaExceeded, temp_quota_exceeded)
+
+    # Pages
+    app.add_url_rule("/", view_func=index)
+    app.add_url_rule("/todo", view_func=todo)
+    app.add_url_rule("/pdf-tools", view_func=pdf_tools)
+    app.add_url_rule("/image-tools", view_func=image_tools)
+    app.add_url_rule("/video-tools", view_func=video_tools)
+
+    # Server control and metrics
+    app.add_url_rule("/shutdown", view_func=shutdown, methods=["POST"])
+    app.add_url_rule("/restart", view_func=restart, methods=["POST"])
+    app.add_url_rule("/metrics", view_func=metrics_route)
+
+    app.teardown_request(_mark_first_request)
+    return app
 
 # -----------------------------
 # Entry point
 # -----------------------------
 
 if __name__ == "__main__":
-    threading.Timer(1.0, open_browser).start()
+    # Required for the process pool in PyInstaller builds
+    multiprocessing.freeze_support()
+
+    app = create_app()
+    threading.Timer(1.0, open_browser, args=(app,)).start()
+    start_warm_up(app)
 
+    # Single process; use scripts/run_local.py to serve with every core
     app.run(
-        host="127.0.0.1",
-        port=5000,
+        host=app.config["HOST"],
+        port=app.config["PORT"],
         debug=False,
+        threaded=True,
     )
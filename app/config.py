@@ -0,0 +1,119 @@
+# app/config.py
+
+"""
+App-level configuration.
+
+Every uppercase name in this file is loaded into Flask's app.config at
+startup. Values can be overridden with an environment variable of the
+same name prefixed with WORKBENCH_ (e.g. WORKBENCH_POOL_WORKERS=4).
+"""
+
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(f"WORKBENCH_{name}")
+    return int(value) if value else default
+
+
+# -----------------------------
+# Serving
+# -----------------------------
+
+# Address the server listens on. Use 0.0.0.0 to serve the local network.
+HOST = os.environ.get("WORKBENCH_HOST", "127.0.0.1")
+PORT = _env_int("PORT", 5000)
+
+# Pre-fork server (scripts/run_local.py): worker processes, and threads
+# per worker. Every open /api/todo/events stream (one per to-do tab)
+# holds a thread, so at most SERVER_EVENT_STREAMS of them are served per
+# worker (0 = no limit); further tabs are told to retry later.
+SERVER_WORKERS = _env_int("SERVER_WORKERS", os.cpu_count() or 1)
+SERVER_THREADS = _env_int("SERVER_THREADS", 8)
+SERVER_EVENT_STREAMS = _env_int("SERVER_EVENT_STREAMS", SERVER_THREADS // 2)
+
+# Seconds a silent worker may take before it is restarted, and seconds
+# in-flight requests get to finish on shutdown or restart
+SERVER_TIMEOUT = _env_int("SERVER_TIMEOUT", 900)
+SERVER_GRACEFUL_TIMEOUT = _env_int("SERVER_GRACEFUL_TIMEOUT", 60)
+
+# Largest accepted request body in bytes (0 = no limit)
+MAX_CONTENT_LENGTH = _env_int("MAX_CONTENT_LENGTH", 0) or None
+
+# Largest upload per tool in bytes (0 = only MAX_CONTENT_LENGTH applies).
+# Uploads are written straight into the request's work directory.
+UPLOAD_LIMITS = {
+    "pdf": _env_int("UPLOAD_LIMIT_PDF", 2 * 1024 ** 3),
+    "image": _env_int("UPLOAD_LIMIT_IMAGE", 512 * 1024 ** 2),
+    "video": _env_int("UPLOAD_LIMIT_VIDEO", 16 * 1024 ** 3),
+}
+
+# Import the heavy tool libraries (pypdf, Pillow, moviepy) in the
+# background once the server has answered its first request, so the
+# first use of a tool doesn't wait for them. 0 loads them on first use.
+WARM_UP = _env_int("WARM_UP", 1)
+
+# -----------------------------
+# Parallel processing
+# -----------------------------
+
+# Worker processes used for CPU-bound batch jobs (e.g. multi-image uploads).
+# 0 or 1 runs every job inline in the request thread. Every server
+# worker has its own pool; scripts/run_local.py defaults this to an even
+# share of the cores.
+POOL_WORKERS = _env_int("POOL_WORKERS", os.cpu_count() or 1)
+
+# -----------------------------
+# Result cache
+# -----------------------------
+
+# Size bound (bytes) of the on-disk cache of image/PDF results.
+# 0 disables the cache.
+CACHE_MAX_BYTES = _env_int("CACHE_MAX_BYTES", 512 * 1024 * 1024)
+
+# -----------------------------
+# Temporary workspaces
+# -----------------------------
+
+# Total size (bytes) of the per-request work directories under temp/.
+# A request that would go over waits up to TEMP_QUOTA_WAIT seconds for
+# room, then gets a 503. 0 disables the quota.
+TEMP_QUOTA_BYTES = _env_int("TEMP_QUOTA_BYTES", 20 * 1024 ** 3)
+TEMP_QUOTA_WAIT = _env_int("TEMP_QUOTA_WAIT", 30)
+
+# Work directories left behind by a crash or a killed worker are removed
+# at startup and every TEMP_SWEEP_INTERVAL seconds (0 = startup only).
+# Any work directory older than TEMP_MAX_AGE seconds is removed too.
+TEMP_SWEEP_INTERVAL = _env_int("TEMP_SWEEP_INTERVAL", 300)
+TEMP_MAX_AGE = _env_int("TEMP_MAX_AGE", 24 * 3600)
+
+# RAM-backed directory (e.g. /dev/shm/workbench) for image jobs of up to
+# TEMP_RAM_JOB_BYTES, while it holds less than TEMP_RAM_QUOTA_BYTES.
+# Empty keeps every job on disk.
+TEMP_RAM_DIR = os.environ.get("WORKBENCH_TEMP_RAM_DIR", "")
+TEMP_RAM_JOB_BYTES = _env_int("TEMP_RAM_JOB_BYTES", 32 * 1024 ** 2)
+TEMP_RAM_QUOTA_BYTES = _env_int("TEMP_RAM_QUOTA_BYTES", 256 * 1024 ** 2)
+
+# -----------------------------
+# Video encoding
+# -----------------------------
+
+# Default encode profile ("fast", "balanced" or "small"), used when a
+# request does not pick one. See backend/video/encode_profiles.py.
+VIDEO_ENCODE_PROFILE = os.environ.get("WORKBENCH_VIDEO_ENCODE_PROFILE", "balanced")
+
+# x264 encoder threads; 0 uses every core
+VIDEO_THREADS = _env_int("VIDEO_THREADS", 0)
+
+# -----------------------------
+# To-do storage
+# -----------------------------
+
+# "file" rewrites data/todo.json on every change; "journal" appends
+# changes to data/todo.journal.jsonl and compacts it into todo.json
+# once it holds TODO_JOURNAL_COMPACT_THRESHOLD transactions; "sharded"
+# keeps one file per workspace under data/users/<TODO_USER>/ (todo.json
+# is migrated there on first use).
+TODO_STORAGE = os.environ.get("WORKBENCH_TODO_STORAGE", "file")
+TODO_JOURNAL_COMPACT_THRESHOLD = _env_int("TODO_JOURNAL_COMPACT_THRESHOLD", 1000)
+TODO_USER = os.environ.get("WORKBENCH_TODO_USER", "local")
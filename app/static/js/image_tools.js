@@ -3,6 +3,7 @@ document.addEventListener("DOMContentLoaded", () => {
     const presetRadios = document.querySelectorAll("input[name='resize-preset']");
     const widthInput = document.getElementById("custom-width");
     const heightInput = document.getElementById("custom-height");
+    const fastInput = document.getElementById("resize-fast");
     const submitBtn = document.getElementById("resize-image");
 
     submitBtn.addEventListener("click", async () => {
@@ -44,6 +45,8 @@ document.addEventListener("DOMContentLoaded", () => {
             formData.append("preset", selectedPreset.value);
         }
 
+        formData.append("mode", fastInput.checked ? "fast" : "quality");
+
         submitBtn.disabled = true;
         submitBtn.textContent = "Processing...";
 
@@ -60,6 +60,15 @@ splitButton.addEventListener("click", async () => {
     const formData = new FormData();
     formData.append("pdf", splitInput.files[0]);
 
+    // Explicit ranges win over "pages per file"
+    const ranges = document.getElementById("split-ranges").value.trim();
+    const every = parseInt(document.getElementById("split-every").value);
+    if (ranges) {
+        formData.append("ranges", ranges);
+    } else if (every > 1) {
+        formData.append("every", every);
+    }
+
     try {
         const response = await fetch("/pdf-tools/split", {
             method: "POST",
@@ -99,9 +108,17 @@ document.getElementById("compress-pdf").addEventListener("click", async () => {
         quality = 20; // fallback default
     }
 
+    // Optional size budget in MB: the backend picks quality and image size
+    const targetMB = parseFloat(document.getElementById("pdf-target-size").value);
+    const targetSize = targetMB > 0 ? Math.floor(targetMB * 1024 * 1024) : null;
+
     const formData = new FormData();
     formData.append("pdf", fileInput.files[0]);
-    formData.append("quality", quality); // pass quality to backend
+    if (targetSize) {
+        formData.append("target_size", targetSize);
+    } else {
+        formData.append("quality", quality); // pass quality to backend
+    }
 
     const response = await fetch("/pdf-tools/compress", {
         method: "POST",
@@ -122,4 +139,8 @@ document.getElementById("compress-pdf").addEventListener("click", async () => {
     a.click();
     a.remove();
     URL.revokeObjectURL(url);
+
+    if (targetSize && blob.size > targetSize) {
+        alert(`Could not reach the target size; the smallest result is ${(blob.size / 1024 / 1024).toFixed(1)} MB`);
+    }
 });
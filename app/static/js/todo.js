@@ -5,6 +5,7 @@
 // ==============================
 let currentWorkspace = null;
 let workspaces = [];
+let currentTasks = [];
 
 // ==============================
 // DOM elements
@@ -48,7 +49,7 @@ async function loadWorkspaces() {
         }
 
         renderWorkspaceSelect();
-        if (currentWorkspace) await loadTasks();
+        await loadTasks();
     } else {
         showAlert(res.error);
     }
@@ -143,9 +144,14 @@ workspaceDeleteBtn.addEventListener("click", deleteWorkspace);
 // Task Functions
 // ==============================
 
+// The server sends an ETag with Cache-Control: no-cache, so the browser
+// revalidates and unchanged lists come back as a body-less 304
 async function loadTasks() {
-    tasksContainer.innerHTML = "";
-    if (!currentWorkspace) return;
+    if (!currentWorkspace) {
+        currentTasks = [];
+        renderTasks();
+        return;
+    }
 
     const res = await fetchJSON(`/api/todo/tasks/${encodeURIComponent(currentWorkspace)}`);
     if (!res.success) {
@@ -153,7 +159,15 @@ async function loadTasks() {
         return;
     }
 
-    res.tasks.forEach((task, index) => {
+    currentTasks = res.tasks;
+    renderTasks();
+}
+
+
+function renderTasks() {
+    tasksContainer.innerHTML = "";
+
+    currentTasks.forEach(task => {
         const details = document.createElement("details");
         const summary = document.createElement("summary");
         details.className = "panel";
@@ -176,7 +190,7 @@ async function loadTasks() {
         editBtn.className = "button";
         editBtn.style.marginRight = "0.5rem";
         editBtn.textContent = "Edit";
-        editBtn.addEventListener("click", () => startEditTask(task, index));
+        editBtn.addEventListener("click", () => startEditTask(task));
         btnContainer.appendChild(editBtn);
 
         tasksContainer.appendChild(details);
@@ -195,7 +209,7 @@ async function loadTasks() {
                 `,
                 onConfirm: async () => {
                     const res = await fetchJSON(
-                        `/api/todo/tasks/${encodeURIComponent(currentWorkspace)}/${index}`,
+                        `/api/todo/tasks/${encodeURIComponent(currentWorkspace)}/id/${encodeURIComponent(task.id)}`,
                         { method: "DELETE" }
                     );
 
@@ -238,11 +252,11 @@ const taskModalCancelBtn = document.getElementById("task-modal-cancel");
 
 // Modal state
 let taskModalMode = "edit"; // "edit" | "create"
-let currentEditIndex = null;
+let currentEditId = null;
 
-function openTaskModal({ mode, task = null, index = null }) {
+function openTaskModal({ mode, task = null }) {
     taskModalMode = mode;
-    currentEditIndex = mode === "edit" ? index : null;
+    currentEditId = mode === "edit" ? task.id : null;
 
     taskModalTitleInput.value = task ? task.title : "";
     taskModalDescInput.value = task ? task.description : "";
@@ -254,13 +268,13 @@ function openTaskModal({ mode, task = null, index = null }) {
 }
 
 function closeTaskModal() {
-    currentEditIndex = null;
+    currentEditId = null;
     taskModalMode = "edit";
     taskModal.classList.remove("show");
 }
 
-function startEditTask(task, index) {
-    openTaskModal({ mode: "edit", task, index });
+function startEditTask(task) {
+    openTaskModal({ mode: "edit", task });
 }
 
 // Save (create or edit)
@@ -277,7 +291,7 @@ taskModalSaveBtn.addEventListener("click", async () => {
 
     if (taskModalMode === "edit") {
         res = await fetchJSON(
-            `/api/todo/tasks/${encodeURIComponent(currentWorkspace)}/${currentEditIndex}`,
+            `/api/todo/tasks/${encodeURIComponent(currentWorkspace)}/id/${encodeURIComponent(currentEditId)}`,
             {
                 method: "PUT",
                 headers: { "Content-Type": "application/json" },
@@ -307,6 +321,38 @@ taskModalSaveBtn.addEventListener("click", async () => {
 taskModalCancelBtn.addEventListener("click", closeTaskModal);
 
 
+// ==============================
+// Live updates (changes from other tabs)
+// ==============================
+
+function applyChange(change) {
+    if (change.op === "add_workspace" || change.op === "remove_workspace") {
+        loadWorkspaces();
+        return;
+    }
+
+    const target = change.to_workspace || change.workspace;
+    if (change.workspace !== currentWorkspace && target !== currentWorkspace) return;
+
+    const index = currentTasks.findIndex(t => t.id === change.id);
+    if (change.op === "edit_task" && index !== -1) {
+        currentTasks[index] = change.task;
+    } else {
+        if (index !== -1) currentTasks.splice(index, 1);
+        if (change.task && target === currentWorkspace) {
+            const position = change.position ?? currentTasks.length;
+            currentTasks.splice(position, 0, change.task);
+        }
+    }
+    renderTasks();
+}
+
+const todoEvents = new EventSource("/api/todo/events");
+todoEvents.addEventListener("change", e => applyChange(JSON.parse(e.data)));
+// Missed some changes: reload everything
+todoEvents.addEventListener("reset", () => loadWorkspaces());
+
+
 // ==============================
 // Generic Action Modal
 // ==============================
@@ -3,6 +3,7 @@ document.addEventListener("DOMContentLoaded", () => {
     const musicInput = document.getElementById("music-file");
     const musicStartInput = document.getElementById("music-start");
     const volumeInput = document.getElementById("music-volume");
+    const profileInput = document.getElementById("encode-profile");
     const processBtn = document.getElementById("process-video");
 
     processBtn.addEventListener("click", async () => {
@@ -52,6 +53,10 @@ document.addEventListener("DOMContentLoaded", () => {
             }
         }
 
+        if (profileInput.value) {
+            formData.append("profile", profileInput.value);
+        }
+
         // -----------------------------
         // UI feedback
         // -----------------------------
@@ -1,5 +1,7 @@
 from pathlib import Path
-from PIL import Image, ImageFilter, ImageOps
+from PIL import Image, ImageFilter
+
+from backend.utils.metrics import stage
 
 
 # -----------------------------
@@ -14,6 +16,146 @@ SUPPORTED_FILTERS = {
 }
 
 
+# -----------------------------
+# Colour matrices
+# -----------------------------
+# Each matrix is an affine RGB transform written as three rows of
+# (r, g, b, offset), the same layout Pillow's convert(matrix=...) expects.
+
+IDENTITY = (
+    (1.0, 0.0, 0.0, 0.0),
+    (0.0, 1.0, 0.0, 0.0),
+    (0.0, 0.0, 1.0, 0.0),
+)
+
+# ITU-R 601-2 luma, the same weights ImageOps.grayscale uses
+LUMA = (0.299, 0.587, 0.114)
+
+# Classic sepia tone applied on top of the grayscale value
+SEPIA_TONE = (
+    0.393 + 0.769 + 0.189,
+    0.349 + 0.686 + 0.168,
+    0.272 + 0.534 + 0.131,
+)
+
+COLOR_MATRICES = {
+    "grayscale": tuple((*LUMA, 0.0) for _ in range(3)),
+    "sepia": tuple(tuple(k * c for c in LUMA) + (0.0,) for k in SEPIA_TONE),
+    "invert": (
+        (-1.0, 0.0, 0.0, 255.0),
+        (0.0, -1.0, 0.0, 255.0),
+        (0.0, 0.0, -1.0, 255.0),
+    ),
+}
+
+
+def _blend_matrix(matrix, strength: float):
+    """Return the matrix equivalent of Image.blend(img, matrix(img), strength)."""
+    return tuple(
+        tuple((1.0 - strength) * i + strength * m for i, m in zip(id_row, row))
+        for id_row, row in zip(IDENTITY, matrix)
+    )
+
+
+def _compose(first, second):
+    """Return a single matrix applying `first` and then `second`."""
+    composed = []
+    for row in second:
+        coefficients = [
+            sum(row[k] * first[k][j] for k in range(3))
+            for j in range(3)
+        ]
+        offset = sum(row[k] * first[k][3] for k in range(3)) + row[3]
+        composed.append((*coefficients, offset))
+    return tuple(composed)
+
+
+def _stays_in_range(matrix) -> bool:
+    """
+    Check whether the matrix maps every 0–255 pixel into 0–255.
+
+    Only then can another stage be folded into it: otherwise the
+    intermediate clamp to 0–255 changes the result.
+    """
+    for *coefficients, offset in matrix:
+        low = offset + 255 * sum(c for c in coefficients if c < 0)
+        high = offset + 255 * sum(c for c in coefficients if c > 0)
+        if low < -0.5 or high > 255.5:
+            return False
+    return True
+
+
+def _apply_matrix(img: Image.Image, matrix) -> Image.Image:
+    if matrix is None:
+        return img
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img.convert("RGB", tuple(value for row in matrix for value in row))
+
+
+def _apply_blur(img: Image.Image, strength: float) -> Image.Image:
+    # Scale blur radius from intensity
+    radius = 0.1 + (strength * 5.0)
+    blurred = img.filter(ImageFilter.GaussianBlur(radius))
+    if strength >= 1.0:
+        return blurred
+    return Image.blend(img, blurred, strength)
+
+
+# -----------------------------
+# Fused pipeline
+# -----------------------------
+
+def run_filter_pipeline(
+    img: Image.Image,
+    filters: list[str],
+    strength: float,
+) -> Image.Image:
+    """
+    Run a filter chain on an already opened image.
+
+    Grayscale and invert blended by `strength` are affine colour transforms,
+    so consecutive ones (and a full-strength sepia) are folded into a
+    single matrix and applied with one Image.convert call. Blur and a
+    partial sepia still need their own pass and blend.
+    """
+    if strength <= 0:
+        return img
+
+    pending = None
+
+    for filter_name in filters:
+        if filter_name == "blur":
+            img = _apply_matrix(img, pending)
+            pending = None
+            img = _apply_blur(img, strength)
+            continue
+
+        matrix = COLOR_MATRICES[filter_name]
+
+        if strength < 1.0 and not _stays_in_range(matrix):
+            # Sepia clips before it is blended, so the blend is not affine
+            # and cannot be folded: apply the clipped tone, then blend
+            img = _apply_matrix(img, pending)
+            pending = None
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img = Image.blend(img, _apply_matrix(img, matrix), strength)
+            continue
+
+        stage = _blend_matrix(matrix, strength)
+
+        if pending is None:
+            pending = stage
+        elif _stays_in_range(pending):
+            pending = _compose(pending, stage)
+        else:
+            img = _apply_matrix(img, pending)
+            pending = stage
+
+    return _apply_matrix(img, pending)
+
+
 def apply_filters(
     input_path: Path,
     output_path: Path,
@@ -56,60 +198,16 @@ def apply_filters(
     # -----------------------------
 
     with Image.open(input_path) as img:
-        if img.mode not in ("RGB", "L"):
-            img = img.convert("RGB")
-
-        for filter_name in filters:
-
-            # -----------------------------
-            # Grayscale
-            # -----------------------------
-            if filter_name == "grayscale":
-                gray = ImageOps.grayscale(img)
-                img = Image.blend(img.convert("RGB"), gray.convert("RGB"), strength)
-
-            # -----------------------------
-            # Sepia
-            # -----------------------------
-            elif filter_name == "sepia":
-                gray = ImageOps.grayscale(img)
-                sepia = gray.convert("RGB")
-
-                pixels = sepia.load()
-                width, height = sepia.size
-
-                for y in range(height):
-                    for x in range(width):
-                        r, g, b = sepia.getpixel((x, y))
-                        tr = int(0.393 * r + 0.769 * g + 0.189 * b)
-                        tg = int(0.349 * r + 0.686 * g + 0.168 * b)
-                        tb = int(0.272 * r + 0.534 * g + 0.131 * b)
-                        pixels[x, y] = (
-                            min(tr, 255),
-                            min(tg, 255),
-                            min(tb, 255),
-                        )
-
-                img = Image.blend(img, sepia, strength)
-
-            # -----------------------------
-            # Invert colors
-            # -----------------------------
-            elif filter_name == "invert":
-                inverted = ImageOps.invert(img)
-                img = Image.blend(img, inverted, strength)
-
-            # -----------------------------
-            # Blur
-            # -----------------------------
-            elif filter_name == "blur":
-                # Scale blur radius from intensity
-                radius = 0.1 + (strength * 5.0)
-                blurred = img.filter(ImageFilter.GaussianBlur(radius))
-                img = Image.blend(img, blurred, strength)
+        with stage("image.filters.decode"):
+            img.load()
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+
+        with stage("image.filters.apply"):
+            img = run_filter_pipeline(img, filters, strength)
 
         # -----------------------------
         # Save output
         # -----------------------------
-        img.save(output_path)
-
+        with stage("image.filters.encode"):
+            img.save(output_path)
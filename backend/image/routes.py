@@ -3,15 +3,16 @@ from flask import (
     request,
     send_file,
     jsonify,
-    after_this_request,
+    current_app,
 )
 from pathlib import Path
 import uuid
-import zipfile
 
-from backend.image.resize_service import resize_image
-from backend.image.filter_service import apply_filters
-from backend.utils.temp_cleanup import cleanup_temp_dir
+from backend.utils.process_pool import iter_jobs
+from backend.utils.result_cache import result_cache
+from backend.utils.temp_workspace import request_workspace
+from backend.utils.uploads import save_upload, spool_uploads
+from backend.utils.zip_stream import FailedEntry, zip_response
 
 
 # -----------------------------
@@ -24,14 +25,6 @@ image_bp = Blueprint(
     url_prefix="/api/image-tools"
 )
 
-# -----------------------------
-# Paths
-# -----------------------------
-
-PROJECT_ROOT = Path(__file__).resolve().parents[2]
-TEMP_DIR = PROJECT_ROOT / "temp"
-TEMP_DIR.mkdir(exist_ok=True)
-
 # -----------------------------
 # Limits
 # -----------------------------
@@ -39,12 +32,96 @@ TEMP_DIR.mkdir(exist_ok=True)
 MAX_FILES = 10
 
 
+def _pool_workers() -> int:
+    """Worker processes used to spread a batch across cores."""
+    return current_app.config.get("POOL_WORKERS", 1)
+
+
+def _failed(job: dict, name: str, error: Exception) -> FailedEntry:
+    """Report a failed job under its upload's name, not the work dir path."""
+    return FailedEntry(name, str(error).replace(str(job["input_path"]), name))
+
+
+def _iter_batch(operation: str, func, jobs: list[dict], names: list[str], *, workers: int):
+    """
+    Produce every job's output file and yield the output paths in order.
+
+    Results already in the result cache are linked into place; the
+    remaining jobs run on the process pool and are cached as they finish.
+    A job that fails yields a FailedEntry named after its upload (`names`
+    holds the upload filename of each job) and the others go on.
+    """
+    if not result_cache.enabled:
+        results = iter_jobs(func, jobs, workers=workers, return_exceptions=True)
+        for job, name, result in zip(jobs, names, results):
+            if isinstance(result, Exception):
+                yield _failed(job, name, result)
+            else:
+                yield job["output_path"]
+        return
+
+    keys = []
+    pending = []
+    for job in jobs:
+        key = result_cache.job_key(operation, job)
+        cached = result_cache.fetch(key, job["output_path"])
+        keys.append(None if cached else key)
+        if not cached:
+            pending.append(job)
+
+    # Results come back in submission order, which is job order
+    results = iter_jobs(func, pending, workers=workers, return_exceptions=True)
+
+    for key, job, name in zip(keys, jobs, names):
+        if key is not None:
+            result = next(results)
+            if isinstance(result, Exception):
+                yield _failed(job, name, result)
+                continue
+            result_cache.store(key, job["output_path"])
+        yield job["output_path"]
+
+
+def _batch_response(paths, count: int, download_name: str):
+    """
+    Send a single output directly, or stream several as a ZIP archive
+    whose entries go out as soon as each image is done (failed images
+    are listed in its ERRORS.txt).
+
+    Raises:
+        ValueError: If the single image, or every image, failed.
+    """
+    if count == 1:
+        output_path = next(paths)
+        if isinstance(output_path, FailedEntry):
+            raise ValueError(output_path.error)
+        return send_file(
+            output_path,
+            as_attachment=True,
+            download_name=output_path.name,
+        )
+
+    return zip_response(paths, download_name)
+
+
 # =========================================================
 # Resize route
 # =========================================================
 
 @image_bp.route("/resize", methods=["POST"])
 def resize_images():
+    # Pillow is imported on first use to keep startup fast (see app.py warm-up)
+    from backend.image.resize_service import resize_image
+
+    # -----------------------------
+    # Isolated work directory, removed AFTER the response
+    # (small batches go to RAM when TEMP_RAM_DIR is set)
+    # -----------------------------
+    work_dir = request_workspace("image_resize", prefer_ram=True)
+
+    # Uploads are written straight into the work directory
+    spool_uploads(work_dir, "image")
+
     files = request.files.getlist("files")
 
     if not files:
@@ -56,22 +133,10 @@ def resize_images():
     preset = request.form.get("preset")
     width = request.form.get("width", type=int)
     height = request.form.get("height", type=int)
+    mode = request.form.get("mode") or "quality"
 
-    # -----------------------------
-    # Create isolated work directory
-    # -----------------------------
-    work_dir = TEMP_DIR / f"image_resize_{uuid.uuid4().hex}"
-    work_dir.mkdir(parents=True, exist_ok=True)
-
-    # -----------------------------
-    # Guaranteed cleanup AFTER response
-    # -----------------------------
-    @after_this_request
-    def cleanup(response):
-        cleanup_temp_dir(work_dir)
-        return response
-
-    output_files = []
+    jobs = []
+    names = []
 
     try:
         for file in files:
@@ -80,45 +145,31 @@ def resize_images():
             input_path = work_dir / f"input_{uuid.uuid4().hex}{suffix}"
             output_path = work_dir / f"{Path(file.filename).stem}_resized{suffix}"
 
-            file.save(input_path)
+            save_upload(file, input_path)
 
-            resize_image(
-                input_path=input_path,
-                output_path=output_path,
-                preset=preset,
-                width=width,
-                height=height,
-            )
-
-            output_files.append(output_path)
+            names.append(file.filename)
+            jobs.append({
+                "input_path": input_path,
+                "output_path": output_path,
+                "preset": preset,
+                "width": width,
+                "height": height,
+                "mode": mode,
+            })
 
         # -----------------------------
-        # Single file
+        # Process (spread across cores)
         # -----------------------------
-        if len(output_files) == 1:
-            return send_file(
-                output_files[0],
-                as_attachment=True,
-                download_name=output_files[0].name,
-            )
+        outputs = _iter_batch(
+            "resize_image", resize_image, jobs, names, workers=_pool_workers()
+        )
 
         # -----------------------------
-        # Multiple files → zip
+        # Single file, or multiple files → streamed zip
         # -----------------------------
-        zip_path = work_dir / "resized_images.zip"
-
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in output_files:
-                zipf.write(file_path, arcname=file_path.name)
-
-        return send_file(
-            zip_path,
-            as_attachment=True,
-            download_name="resized_images.zip",
-        )
+        return _batch_response(outputs, len(jobs), "resized_images.zip")
 
     except Exception as e:
-        cleanup_temp_dir(work_dir)  # safety net
         return jsonify({"error": str(e)}), 400
 
 
@@ -127,6 +178,18 @@ def resize_images():
 # =========================================================
 @image_bp.route("/filters", methods=["POST"])
 def apply_image_filters():
+    # Pillow is imported on first use to keep startup fast (see app.py warm-up)
+    from backend.image.filter_service import apply_filters
+
+    # -----------------------------
+    # Isolated work directory, removed AFTER the response
+    # (small batches go to RAM when TEMP_RAM_DIR is set)
+    # -----------------------------
+
+    work_dir = request_workspace("image_filters", prefer_ram=True)
+
+    # Uploads are written straight into the work directory
+    spool_uploads(work_dir, "image")
 
     files = request.files.getlist("files")
     filters = request.form.getlist("filters")
@@ -144,14 +207,8 @@ def apply_image_filters():
     if intensity is None:
         return jsonify({"error": "Intensity is required"}), 400
 
-    # -----------------------------
-    # Create isolated work directory
-    # -----------------------------
-
-    work_dir = TEMP_DIR / f"image_filters_{uuid.uuid4().hex}"
-    work_dir.mkdir(parents=True, exist_ok=True)
-
-    output_files = []
+    jobs = []
+    names = []
 
     try:
         for file in files:
@@ -160,56 +217,30 @@ def apply_image_filters():
             input_path = work_dir / f"input_{uuid.uuid4().hex}{suffix}"
             output_path = work_dir / f"filtered_{file.filename}"
 
-            file.save(input_path)
-
-            apply_filters(
-                input_path=input_path,
-                output_path=output_path,
-                filters=filters,
-                intensity=intensity,
-            )
+            save_upload(file, input_path)
 
-            output_files.append(output_path)
+            names.append(file.filename)
+            jobs.append({
+                "input_path": input_path,
+                "output_path": output_path,
+                "filters": filters,
+                "intensity": intensity,
+            })
 
         # -----------------------------
-        # Single file → direct download
+        # Process (spread across cores)
         # -----------------------------
 
-        if len(output_files) == 1:
-            response = send_file(
-                output_files[0],
-                as_attachment=True,
-                download_name=output_files[0].name,
-            )
+        outputs = _iter_batch(
+            "apply_filters", apply_filters, jobs, names, workers=_pool_workers()
+        )
 
         # -----------------------------
-        # Multiple files → zip
+        # Single file → direct download
+        # Multiple files → streamed zip
         # -----------------------------
 
-        else:
-            zip_path = work_dir / "filtered_images.zip"
-
-            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                for file_path in output_files:
-                    zipf.write(file_path, arcname=file_path.name)
-
-            response = send_file(
-                zip_path,
-                as_attachment=True,
-                download_name="filtered_images.zip",
-            )
+        return _batch_response(outputs, len(jobs), "filtered_images.zip")
 
     except Exception as e:
-        cleanup_temp_dir(work_dir)
         return jsonify({"error": str(e)}), 400
-
-    # -----------------------------
-    # Guaranteed cleanup
-    # -----------------------------
-
-    @after_this_request
-    def cleanup(response):
-        cleanup_temp_dir(work_dir)
-        return response
-
-    return response
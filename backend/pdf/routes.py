@@ -1,25 +1,24 @@
-from flask import Blueprint, request, send_file, jsonify, after_this_request
-from backend.pdf.service import merge_pdfs, split_pdf, compress_pdf
-from backend.utils.temp_cleanup import cleanup_temp_dir
-from pathlib import Path
-import tempfile
-import zipfile
-import uuid
+from flask import Blueprint, current_app, request, send_file, jsonify
+from backend.utils.result_cache import cached_call
+from backend.utils.temp_workspace import request_workspace
+from backend.utils.uploads import save_upload, spool_uploads
+from backend.utils.zip_stream import FailedEntry, zip_response
+from functools import partial
 
 pdf_bp = Blueprint("pdf", __name__, url_prefix="/pdf-tools")
 
-# -----------------------------
-# Temp directory
-# -----------------------------
-PROJECT_ROOT = Path(__file__).resolve().parents[2]
-TEMP_DIR = PROJECT_ROOT / "temp"
-TEMP_DIR.mkdir(exist_ok=True)
-
 # -----------------------------
 # Merge PDF
 # -----------------------------
 @pdf_bp.route("/merge", methods=["POST"])
 def merge_route():
+    # pypdf is imported on first use to keep startup fast (see app.py warm-up)
+    from backend.pdf.service import merge_pdfs
+
+    # Isolated work dir, removed after the response (uploads are written straight into it)
+    work_dir = request_workspace("pdf_merge")
+    spool_uploads(work_dir, "pdf")
+
     if "pdfs" not in request.files:
         return jsonify({"error": "No files uploaded"}), 400
 
@@ -27,23 +26,17 @@ def merge_route():
     if len(pdf_files) < 2:
         return jsonify({"error": "Please upload at least two PDFs"}), 400
 
-    # Create isolated work dir
-    work_dir = TEMP_DIR / f"pdf_merge_{uuid.uuid4().hex}"
-    work_dir.mkdir(parents=True, exist_ok=True)
-
-    @after_this_request
-    def cleanup(response):
-        cleanup_temp_dir(work_dir)
-        return response
-
     file_paths = []
     for f in pdf_files:
         path = work_dir / f.filename
-        f.save(path)
+        save_upload(f, path)
         file_paths.append(path)
 
     output_path = work_dir / "merged.pdf"
-    merge_pdfs(file_paths, output_path)
+    try:
+        merge_pdfs(file_paths, output_path)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
     return send_file(output_path, as_attachment=True, download_name="merged.pdf")
 
@@ -53,31 +46,30 @@ def merge_route():
 # -----------------------------
 @pdf_bp.route("/split", methods=["POST"])
 def split_route():
+    from backend.pdf.service import iter_split_pdf
+
+    # Removed once the streamed ZIP has been sent
+    work_dir = request_workspace("pdf_split")
+    spool_uploads(work_dir, "pdf")
+
     if "pdf" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
     pdf_file = request.files["pdf"]
+    pdf_path = save_upload(pdf_file, work_dir / pdf_file.filename)
 
-    # Create isolated work dir
-    work_dir = TEMP_DIR / f"pdf_split_{uuid.uuid4().hex}"
-    work_dir.mkdir(parents=True, exist_ok=True)
+    # One PDF per page by default, or parts of N pages, or explicit ranges
+    every = request.form.get("every", type=int) or 1
+    ranges = request.form.get("ranges", "").strip() or None
 
-    @after_this_request
-    def cleanup(response):
-        cleanup_temp_dir(work_dir)
-        return response
-
-    pdf_path = work_dir / pdf_file.filename
-    pdf_file.save(pdf_path)
-
-    pages = split_pdf(pdf_path, work_dir)
-
-    zip_path = work_dir / f"{pdf_path.stem}_pages.zip"
-    with zipfile.ZipFile(zip_path, "w") as zipf:
-        for page_file in pages:
-            zipf.write(page_file, arcname=page_file.name)
-
-    return send_file(zip_path, as_attachment=True, download_name=zip_path.name)
+    # Parts are zipped and sent while the rest are still being split; a
+    # part that can't be written is listed in the ZIP's ERRORS.txt
+    try:
+        parts = iter_split_pdf(pdf_path, work_dir, every=every, ranges=ranges,
+                               on_error=lambda name, e: FailedEntry(name, str(e)))
+        return zip_response(parts, f"{pdf_path.stem}_pages.zip")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 
 # -----------------------------
@@ -85,28 +77,47 @@ def split_route():
 # -----------------------------
 @pdf_bp.route("/compress", methods=["POST"])
 def compress_route():
+    from backend.pdf.service import compress_pdf, compress_pdf_to_size
+
+    # Isolated work dir, removed after the response (uploads are written straight into it)
+    work_dir = request_workspace("pdf_compress")
+    spool_uploads(work_dir, "pdf")
+
     if "pdf" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
     pdf_file = request.files["pdf"]
+    pdf_path = save_upload(pdf_file, work_dir / pdf_file.filename)
 
-    # Create isolated work dir
-    work_dir = TEMP_DIR / f"pdf_compress_{uuid.uuid4().hex}"
-    work_dir.mkdir(parents=True, exist_ok=True)
+    output_path = work_dir / f"{pdf_path.stem}_compressed.pdf"
 
-    @after_this_request
-    def cleanup(response):
-        cleanup_temp_dir(work_dir)
-        return response
+    # Worker count only affects speed, so it is not part of the cache key
+    workers = current_app.config.get("POOL_WORKERS", 1)
 
-    pdf_path = work_dir / pdf_file.filename
-    pdf_file.save(pdf_path)
+    # Target-size mode: search quality and image size for the sharpest fit
+    if "target_size" in request.form:
+        target_size = request.form.get("target_size", type=int)
+        if not target_size or target_size <= 0:
+            return jsonify({"error": "target_size must be a positive number of bytes"}), 400
 
-    output_path = work_dir / f"{pdf_path.stem}_compressed.pdf"
+        cached_call(
+            "compress_pdf_to_size",
+            partial(compress_pdf_to_size, workers=workers),
+            input_path=pdf_path,
+            output_path=output_path,
+            target_size=target_size,
+        )
+        return send_file(output_path, as_attachment=True, download_name=output_path.name)
 
     quality = request.form.get("quality", type=int) or 20
 
-    compress_pdf(pdf_path, output_path, image_quality=quality)
+    cached_call(
+        "compress_pdf",
+        partial(compress_pdf, workers=workers),
+        input_path=pdf_path,
+        output_path=output_path,
+        image_quality=quality,
+    )
 
     return send_file(output_path, as_attachment=True, download_name=output_path.name)
 
@@ -1,13 +1,27 @@
 from pathlib import Path
 from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, IndirectObject, NameObject, NumberObject, StreamObject
 
 from PIL import Image
+import hashlib
 import io
 
+from backend.utils.metrics import stage
+from backend.utils.process_pool import iter_jobs
+
+
+# -----------------------------
+# Merge
+# -----------------------------
 
 def merge_pdfs(file_paths, output_path):
     """
     Merge multiple PDF files into a single PDF using PdfWriter.
+
+    Inputs are read one at a time straight from disk and each reader is
+    released once its pages are copied, so only the output is held in
+    memory. Objects that are identical across inputs (fonts, logos) are
+    stored once.
     
     Args:
         file_paths (list of str or Path): List of PDF file paths to merge.
@@ -15,104 +29,630 @@ def merge_pdfs(file_paths, output_path):
     """
     writer = PdfWriter()
 
-    for pdf_path in file_paths:
-        reader = PdfReader(str(pdf_path))
-        for page in reader.pages:
-            writer.add_page(page)
+    with stage("pdf.merge.read"):
+        for pdf_path in file_paths:
+            # A file object (unlike a path) is not read into memory up front
+            with open(pdf_path, "rb") as f:
+                reader = PdfReader(f)
+                for page in reader.pages:
+                    writer.add_page(page)
+                reader.close()
 
     # Save merged PDF
-    with open(output_path, "wb") as f:
-        writer.write(f)
+    with stage("pdf.merge.write"):
+        writer.compress_identical_objects()
+        with open(output_path, "wb") as f:
+            writer.write(f)
 
     return output_path
 
 
-def split_pdf(file_path, output_dir):
+# -----------------------------
+# Split
+# -----------------------------
+
+def parse_page_ranges(spec: str, page_count: int) -> list[tuple[int, int]]:
+    """
+    Parse page ranges such as "1-3, 5, 8-" into (first, last) pairs
+    (1-based, inclusive). An open end runs to the last page.
+
+    Raises:
+        ValueError: If a range is malformed or outside the document.
+    """
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+
+        first, dash, last = part.partition("-")
+        try:
+            first = int(first)
+            last = int(last) if last.strip() else page_count if dash else first
+        except ValueError:
+            raise ValueError(f"Invalid page range: {part!r}")
+
+        if not 1 <= first <= last <= page_count:
+            raise ValueError(f"Page range {part!r} is outside pages 1-{page_count}")
+        if (first, last) not in ranges:
+            ranges.append((first, last))
+
+    if not ranges:
+        raise ValueError("No page ranges given")
+    return ranges
+
+
+def split_pdf(file_path, output_dir, **options):
     """
     Split a PDF file into separate pages, each page becomes a PDF.
     
     Args:
         file_path (str or Path): Caminho do PDF original.
         output_dir (str or Path): Diretório onde os PDFs separados serão salvos.
+        **options: every / ranges, see iter_split_pdf.
     
     Returns:
         List[Path]: Lista com os caminhos dos PDFs gerados.
     """
-    reader = PdfReader(str(file_path))
+    return list(iter_split_pdf(file_path, output_dir, **options))
+
+
+def iter_split_pdf(file_path, output_dir, *, every: int = 1, ranges: str | None = None,
+                   on_error=None):
+    """
+    Same as split_pdf, but yield each part's PDF path as soon as it is written.
+
+    The input is parsed once and read from disk as parts are written. The
+    ranges are checked before returning, so errors surface before any
+    output is produced.
+
+    Args:
+        file_path (str or Path): Original PDF path.
+        output_dir (str or Path): Directory where the part PDFs are saved.
+        every (int): Pages per part (1 = one PDF per page).
+        ranges (str): Explicit page ranges instead, e.g. "1-3, 5, 8-"
+            (see parse_page_ranges).
+        on_error (callable): Called as on_error(name, error) when a part
+            can't be written (e.g. a damaged page); what it returns is
+            yielded in place of the part and the next parts go on. By
+            default the error is raised.
+
+    Raises:
+        ValueError: If `every` or `ranges` don't fit the document.
+    """
+    file_path = Path(file_path)
+    f = open(file_path, "rb")
+    try:
+        reader = PdfReader(f)
+        page_count = len(reader.pages)
+
+        if ranges:
+            parts = parse_page_ranges(ranges, page_count)
+        elif every >= 1:
+            parts = [(first, min(first + every - 1, page_count))
+                     for first in range(1, page_count + 1, every)]
+        else:
+            raise ValueError("Pages per part must be at least 1")
+    except Exception:
+        f.close()
+        raise
+
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
+    return _write_parts(f, reader, parts, output_dir / file_path.stem, on_error)
+
+
+def _write_parts(f, reader, parts, prefix, on_error):
+    with f:
+        for first, last in parts:
+            suffix = f"page_{first}" if first == last else f"pages_{first}-{last}"
+            output_path = prefix.with_name(f"{prefix.name}_{suffix}.pdf")
+
+            try:
+                with stage("pdf.split.part"):
+                    writer = PdfWriter()
+                    for index in range(first - 1, last):
+                        writer.add_page(reader.pages[index])
+                    with open(output_path, "wb") as out:
+                        writer.write(out)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                output_path.unlink(missing_ok=True)
+                yield on_error(output_path.name, e)
+                continue
+
+            yield output_path
+
+
+# -----------------------------
+# Compress
+# -----------------------------
+
+def _image_key(xobj):
+    """Content hash of an image XObject: identical copies share a key."""
+    digest = hashlib.sha1()
+    for entry in ("/Width", "/Height", "/BitsPerComponent", "/ColorSpace", "/Filter", "/DecodeParms"):
+        digest.update(repr(xobj.get(entry)).encode())
+    digest.update(bytes(xobj._data))
+    return digest.hexdigest()
+
+
+def _collect_images(reader):
+    """
+    Find the distinct image XObjects used by the pages.
+
+    An image referenced from many pages (a logo, a letterhead) is one
+    indirect object and is listed once; identical images stored as
+    separate objects share a content hash and are processed once too.
+
+    Returns:
+        dict: content key -> {"page": first page using it,
+                              "objects": stream objects holding that image}
+    """
+    images = {}
+    seen_refs = set()
+
+    for page_num, page in enumerate(reader.pages, start=1):
+        resources = page.get("/Resources")
+        if resources is None:
+            continue
+        resources = resources.get_object()
+        if "/XObject" not in resources:
+            continue
+
+        xobjects = resources["/XObject"].get_object()
+        for name in list(xobjects.keys()):
+            raw = xobjects.raw_get(name)
+            if isinstance(raw, IndirectObject):
+                ref = (raw.idnum, raw.generation)
+                if ref in seen_refs:
+                    continue
+                seen_refs.add(ref)
+
+            xobj = xobjects[name]
+            if xobj.get("/Subtype") != "/Image":
+                continue
+
+            entry = images.setdefault(_image_key(xobj), {"page": page_num, "objects": []})
+            entry["objects"].append(xobj)
+
+    return images
+
+
+# Filters whose output is a complete image file Pillow can open
+CONTAINER_FILTERS = {"/DCTDecode", "/JPXDecode"}
+
+# (color kind, bits per component) -> (Pillow mode, raw mode) of raw pixels
+RAW_MODES = {
+    ("gray", 1): ("1", "1"),
+    ("gray", 2): ("L", "L;2"),
+    ("gray", 4): ("L", "L;4"),
+    ("gray", 8): ("L", "L"),
+    ("rgb", 8): ("RGB", "RGB"),
+    ("cmyk", 8): ("CMYK", "CMYK"),
+    ("indexed", 1): ("P", "P;1"),
+    ("indexed", 2): ("P", "P;2"),
+    ("indexed", 4): ("P", "P;4"),
+    ("indexed", 8): ("P", "P"),
+}
+
+
+def _color_kind(color_space):
+    """
+    Classify a PDF color space as "gray", "rgb", "cmyk" or
+    ("indexed", base kind, palette bytes). Raises ValueError for
+    anything else (Lab, Separation, DeviceN, ...).
+    """
+    color_space = color_space.get_object() if color_space is not None else None
 
-    output_files = []
+    if isinstance(color_space, ArrayObject) and color_space:
+        family = color_space[0]
+        if family == "/ICCBased":
+            components = int(color_space[1].get_object()["/N"])
+            kind = {1: "gray", 3: "rgb", 4: "cmyk"}.get(components)
+            if kind:
+                return kind
+        elif family == "/CalGray":
+            return "gray"
+        elif family == "/CalRGB":
+            return "rgb"
+        elif family == "/Indexed":
+            base = _color_kind(color_space[1])
+            if base not in ("gray", "rgb"):
+                raise ValueError(f"unsupported indexed base color space {color_space[1]}")
+            lookup = color_space[3].get_object()
+            if isinstance(lookup, StreamObject):
+                palette = lookup.get_data()
+            else:
+                palette = getattr(lookup, "original_bytes", None) or bytes(lookup)
+            channels = 1 if base == "gray" else 3
+            return ("indexed", base, palette[: channels * (int(color_space[2]) + 1)])
+    elif color_space == "/DeviceGray":
+        return "gray"
+    elif color_space == "/DeviceRGB":
+        return "rgb"
+    elif color_space == "/DeviceCMYK":
+        return "cmyk"
 
-    for i, page in enumerate(reader.pages, start=1):
+    raise ValueError(f"unsupported color space {color_space}")
+
+
+def _image_spec(xobj):
+    """
+    Describe an image XObject for _decode_image: its decoded stream data
+    and how to turn it into pixels. Raises ValueError if it can't be
+    recompressed safely (masks, custom /Decode arrays, exotic colors).
+    """
+    if xobj.get("/ImageMask"):
+        raise ValueError("stencil masks are kept as they are")
+    if "/Decode" in xobj:
+        raise ValueError("images with a /Decode array are kept as they are")
+    if isinstance(xobj.get("/Mask"), ArrayObject):
+        raise ValueError("color-key masked images are kept as they are")
+
+    filters = xobj.get("/Filter")
+    if isinstance(filters, ArrayObject):
+        filters = filters[-1] if filters else None
+    container = filters in CONTAINER_FILTERS
+
+    kind = _color_kind(xobj.get("/ColorSpace")) if not container else None
+    return {
+        "data": xobj.get_data(),
+        "container": container,
+        "size": (int(xobj["/Width"]), int(xobj["/Height"])),
+        "bits": int(xobj.get("/BitsPerComponent", 8)),
+        "kind": kind,
+    }
+
+
+def _decode_image(data, container, size, bits, kind):
+    """Build a Pillow image (L or RGB) from an image XObject's data."""
+    with stage("pdf.compress.decode"):
+        return _decode_pixels(data, container, size, bits, kind)
+
+
+def _decode_pixels(data, container, size, bits, kind):
+    if container:
+        img = Image.open(io.BytesIO(data))
+        img.load()
+        return img.convert("L" if img.mode in ("L", "1") else "RGB")
+
+    # Raw pixels: rows are packed with no padding other than to a whole byte
+    color = kind[0] if isinstance(kind, tuple) else kind
+    try:
+        mode, rawmode = RAW_MODES[(color, bits)]
+    except KeyError:
+        raise ValueError(f"unsupported {color} image with {bits} bits per component")
+
+    img = Image.frombuffer(mode, size, data, "raw", rawmode, 0, 1)
+    if mode == "P":
+        _, base, palette = kind
+        img.putpalette(palette, rawmode="L" if base == "gray" else "RGB")
+        return img.convert("L" if base == "gray" else "RGB")
+    return img.convert("L" if mode in ("L", "1") else "RGB")
+
+
+def _encode_jpeg(image, quality):
+    img_bytes = io.BytesIO()
+    with stage("pdf.compress.encode"):
+        image.save(img_bytes, format="JPEG", quality=quality, optimize=True)
+    return img_bytes.getvalue()
+
+
+def _recompress_image(spec, image_quality, max_dim):
+    """
+    Decode one image and re-encode it as JPEG (runs in a worker process).
+
+    Returns:
+        tuple: (JPEG bytes, width, height, Pillow mode) or
+               (None, error message, None, None)
+    """
+    try:
+        img = _decode_image(**spec)
+
+        # Resize if larger than max_dim
+        if img.width > max_dim or img.height > max_dim:
+            img.thumbnail((max_dim, max_dim))
+
+        # Recompress image
+        return _encode_jpeg(img, image_quality), img.width, img.height, img.mode
+    except Exception as e:
+        return None, str(e), None, None
+
+
+def _replace_image(xobj, jpeg, width, height, mode):
+    """Store a JPEG in an image XObject and make its dictionary match."""
+    xobj._data = jpeg
+    xobj[NameObject("/Filter")] = NameObject("/DCTDecode")
+    xobj[NameObject("/Width")] = NumberObject(width)
+    xobj[NameObject("/Height")] = NumberObject(height)
+    xobj[NameObject("/BitsPerComponent")] = NumberObject(8)
+    if "/DecodeParms" in xobj:
+        del xobj["/DecodeParms"]
+
+    # Keep calibrated/ICC color spaces with the same number of components
+    try:
+        kind = _color_kind(xobj.get("/ColorSpace"))
+    except ValueError:
+        kind = None
+    if kind != ("gray" if mode == "L" else "rgb"):
+        xobj[NameObject("/ColorSpace")] = NameObject("/DeviceGray" if mode == "L" else "/DeviceRGB")
+
+
+def _write_compressed(reader, output_path) -> int:
+    """Write the (possibly modified) pages of `reader`; return the file size."""
+    with stage("pdf.compress.write"):
         writer = PdfWriter()
-        writer.add_page(page)
+        writer._compress = True
+
+        for page in reader.pages:
+            writer.add_page(page)
+
+        # Copies of an image now hold identical streams: store them once
+        writer.compress_identical_objects()
 
-        output_path = output_dir / f"{file_path.stem}_page_{i}.pdf"
+        # Remove all metadata to reduce size
+        writer.add_metadata({})
+
+        # Save compressed PDF
         with open(output_path, "wb") as f:
             writer.write(f)
 
-        output_files.append(output_path)
-
-    return output_files
+    return Path(output_path).stat().st_size
 
 
-def compress_pdf(input_path: Path, output_path: Path, image_quality: int = 20, max_dim: int = 1200):
+def compress_pdf(input_path: Path, output_path: Path, image_quality: int = 20, max_dim: int = 1200,
+                 *, workers: int = 1):
     """
     Compress a PDF by recompressing images inside it using Pillow (JPEG).
-    
+
+    Each distinct image is processed once, however many pages use it, and
+    the distinct images are re-encoded in parallel on the shared process
+    pool. Both embedded JPEG/JPEG 2000 files and raw pixel streams
+    (FlateDecode etc.) are handled; an image keeps its original stream
+    when the JPEG would not be smaller.
+
     Args:
         input_path (Path): Original PDF path.
         output_path (Path): Path to save compressed PDF.
         image_quality (int): JPEG quality for images (1-100).
         max_dim (int): Maximum dimension (width/height) for images.
+        workers (int): Worker processes for re-encoding (1 = inline).
     """
     reader = PdfReader(str(input_path))
-    writer = PdfWriter()
-    writer._compress = True
+    images = list(_collect_images(reader).values())
 
-    for page_num, page in enumerate(reader.pages, start=1):
-        # Iterate over images in the page (if any)
-        if "/XObject" in page["/Resources"]:
-            xobjects = page["/Resources"]["/XObject"].get_object()
-            for name in list(xobjects.keys()):
-                xobj = xobjects[name]
-                if xobj["/Subtype"] == "/Image":
-                    try:
-                        # Extract image data
-                        data = xobj.get_data()
-                        mode = "RGB"
-                        if xobj["/ColorSpace"] == "/DeviceCMYK":
-                            mode = "CMYK"
-                        elif xobj["/ColorSpace"] == "/DeviceGray":
-                            mode = "L"
-
-                        img = Image.open(io.BytesIO(data)).convert(mode)
-
-                        # Resize if larger than max_dim
-                        if img.width > max_dim or img.height > max_dim:
-                            img.thumbnail((max_dim, max_dim))
-
-                        # Recompress image
-                        img_bytes = io.BytesIO()
-                        img.save(img_bytes, format="JPEG", quality=image_quality, optimize=True)
-                        img_bytes.seek(0)
-
-                        # Replace image in PDF
-                        xobj._data = img_bytes.read()
-                    except Exception as e:
-                        # If something fails, keep original image
-                        print(f"Warning: failed to compress image on page {page_num}: {e}")
-                        continue
-        
-        writer.add_page(page)
-
-    # Remove all metadata to reduce size
-    writer.add_metadata({})
-
-    # Save compressed PDF
-    with open(output_path, "wb") as f:
-        writer.write(f)
+    described = []  # images that could be described, in job order
+
+    def jobs():
+        # Decoded lazily, so only the images in flight are held in memory
+        for entry in images:
+            try:
+                spec = _image_spec(entry["objects"][0])
+            except Exception as e:
+                print(f"Warning: keeping image on page {entry['page']}: {e}")
+                continue
+            described.append(entry)
+            yield {"spec": spec, "image_quality": image_quality, "max_dim": max_dim}
+
+    results = iter_jobs(_recompress_image, jobs(), workers=workers)
+    for position, (jpeg, *info) in enumerate(results):
+        # The job for this result was already taken from jobs()
+        entry = described[position]
 
+        if jpeg is None:
+            # If something fails, keep original image
+            print(f"Warning: failed to compress image on page {entry['page']}: {info[0]}")
+            continue
+
+        xobj = entry["objects"][0]
+        if len(jpeg) >= len(xobj._data):
+            continue  # no gain: keep the original stream
+
+        for xobj in entry["objects"]:
+            _replace_image(xobj, jpeg, *info)
+
+    _write_compressed(reader, output_path)
     return output_path
 
+
+# -----------------------------
+# Compress to a target size
+# -----------------------------
+
+# Image size caps, tried sharpest first; for each one the highest JPEG
+# quality in TARGET_QUALITY that fits the budget is searched for
+TARGET_DIMS = (1600, 1200, 1000, 800, 600, 400)
+TARGET_QUALITY = (10, 85)
+
+# Writes allowed to correct the size estimate before giving up
+TARGET_MAX_WRITES = 3
+
+# Share of the target kept free for what the estimate can't see
+# (object offsets, stream lengths), so a corrected guess rarely overshoots
+TARGET_SLACK = 0.01
+
+# Decoded images kept in memory between encodes, in bytes of pixels;
+# images past it are decoded again from their stream for every encode
+TARGET_DECODED_BYTES = 256 * 1024 ** 2
+
+
+def _encode_scaled(max_dim, quality, spec=None, image=None):
+    """
+    Scale one image down to max_dim and encode it as JPEG (runs in a
+    worker process). The image is decoded from `spec` unless given.
+
+    Returns:
+        tuple: (JPEG bytes, width, height, Pillow mode) or
+               (None, error message, None, None)
+    """
+    try:
+        if image is None:
+            image = _decode_image(**spec)
+        if image.width > max_dim or image.height > max_dim:
+            image = image.copy()
+            image.thumbnail((max_dim, max_dim))
+        return _encode_jpeg(image, quality), image.width, image.height, image.mode
+    except Exception as e:
+        return None, str(e), None, None
+
+
+def _restore_image(xobj, saved):
+    """Undo _replace_image with a (stream data, dictionary) snapshot."""
+    data, entries = saved
+    xobj.clear()
+    xobj.update(entries)
+    xobj._data = data
+
+
+def compress_pdf_to_size(input_path: Path, output_path: Path, target_size: int, *, workers: int = 1):
+    """
+    Compress a PDF so that it fits in `target_size` bytes, keeping its
+    images as sharp as possible.
+
+    The search over image size caps (TARGET_DIMS) and JPEG quality (a
+    binary search within TARGET_QUALITY) estimates the file size from
+    the encoded image sizes; only those sizes are kept per setting, and
+    the JPEGs of the latest one. The PDF is written once and written
+    again only if the estimate was off. When even the smallest setting
+    doesn't fit, that smallest result is kept.
+
+    Args:
+        input_path (Path): Original PDF path.
+        output_path (Path): Path to save compressed PDF.
+        target_size (int): Wanted maximum file size in bytes.
+        workers (int): Worker processes for decoding and re-encoding (1 = inline).
+    """
+    reader = PdfReader(str(input_path))
+
+    entries = []
+    for entry in _collect_images(reader).values():
+        try:
+            _image_spec(entry["objects"][0])
+        except Exception as e:
+            print(f"Warning: keeping image on page {entry['page']}: {e}")
+            continue
+        entries.append(entry)
+
+    saved = [
+        [(xobj._data, dict(xobj)) for xobj in entry["objects"]]
+        for entry in entries
+    ]
+    original_sizes = [len(entry["objects"][0]._data) for entry in entries]
+
+    # -- Re-encoding --
+
+    decoded = {}  # position -> image scaled to TARGET_DIMS[0]
+    decoded_bytes = [0]
+    scaled = {"dim": None, "images": {}}  # the decoded images scaled to one size cap
+    failed = set()  # positions of images that could not be re-encoded
+    sizes = {}  # (max_dim, quality) -> [JPEG size, None if failed, per image]
+    latest = {"setting": None, "images": []}  # JPEGs of the last encode
+
+    def source(position, max_dim):
+        """The image scaled to max_dim, if kept in memory, or its spec."""
+        if scaled["dim"] != max_dim:
+            scaled.update(dim=max_dim, images={})
+
+        if position not in decoded:
+            spec = _image_spec(entries[position]["objects"][0])
+            if decoded_bytes[0] >= TARGET_DECODED_BYTES:
+                return {"spec": spec}
+            try:
+                img = _decode_image(**spec)
+            except Exception:
+                return {"spec": spec}  # the encode reports it
+            img.thumbnail((TARGET_DIMS[0], TARGET_DIMS[0]))
+            decoded[position] = img
+            decoded_bytes[0] += img.width * img.height * len(img.getbands())
+
+        img = scaled["images"].get(position)
+        if img is None:
+            img = decoded[position]
+            if img.width > max_dim or img.height > max_dim:
+                img = img.copy()
+                img.thumbnail((max_dim, max_dim))
+            scaled["images"][position] = img
+        return {"image": img}
+
+    def encode(setting):
+        max_dim, quality = setting
+        if latest["setting"] != setting:
+            latest["images"] = []  # free the previous JPEGs first
+            jobs = (
+                {"max_dim": max_dim, "quality": quality, **source(position, max_dim)}
+                for position in range(len(entries))
+            )
+            images = []
+            for position, (jpeg, *info) in enumerate(iter_jobs(_encode_scaled, jobs, workers=workers)):
+                if jpeg is None and position not in failed:
+                    failed.add(position)
+                    print(f"Warning: failed to compress image on page {entries[position]['page']}: {info[0]}")
+                images.append(None if jpeg is None else (jpeg, *info))
+            latest.update(setting=setting, images=images)
+            sizes[setting] = [None if image is None else len(image[0]) for image in images]
+        return latest["images"]
+
+    def image_bytes(setting):
+        if setting not in sizes:
+            encode(setting)
+        # An image keeps its original stream when the JPEG is not smaller
+        return sum(
+            original if size is None else min(size, original)
+            for size, original in zip(sizes[setting], original_sizes)
+        )
+
+    def best_setting(budget):
+        """Sharpest setting whose images fit in `budget` bytes, else the smallest one."""
+        low_quality, high_quality = TARGET_QUALITY
+        for max_dim in TARGET_DIMS:
+            if image_bytes((max_dim, low_quality)) > budget:
+                continue
+
+            low, high = low_quality, high_quality
+            while low < high:
+                mid = (low + high + 1) // 2
+                if image_bytes((max_dim, mid)) <= budget:
+                    low = mid
+                else:
+                    high = mid - 1
+            return max_dim, low
+
+        return TARGET_DIMS[-1], low_quality
+
+    # -- Search, write, correct the estimate --
+
+    def write(setting):
+        for entry, snapshots, original, image in zip(entries, saved, original_sizes, encode(setting)):
+            for xobj, snapshot in zip(entry["objects"], snapshots):
+                _restore_image(xobj, snapshot)
+                if image is not None and len(image[0]) < original:
+                    _replace_image(xobj, *image)
+        return _write_compressed(reader, output_path)
+
+    # Everything but the images, first estimated from the input file
+    base = Path(input_path).stat().st_size - sum(
+        len(xobj._data) for entry in entries for xobj in entry["objects"]
+    )
+    budget = target_size * (1 - TARGET_SLACK)
+    setting = best_setting(budget - base)
+    fitting = None
+
+    for _ in range(TARGET_MAX_WRITES):
+        size = write(setting)
+        if size <= target_size:
+            fitting = setting
+
+        # Measured from the file just written, the estimate is now close
+        base = size - image_bytes(setting)
+        corrected = best_setting(budget - base)
+        if corrected == setting:
+            break
+        setting = corrected
+
+    # The last write may have overshot where an earlier one fitted
+    if fitting is not None and size > target_size:
+        write(fitting)
+
+    return output_path
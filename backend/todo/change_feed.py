@@ -0,0 +1,275 @@
+# backend/todo/change_feed.py
+
+"""
+Workspace versions and a feed of recent changes for todo clients.
+
+Both follow storage.py as a listener (see storage.add_listener):
+
+- Every workspace has a version, used as the ETag of its task list. It
+  is "<token>-<counter>": the counter goes up with every change made
+  through this process, and the token is renewed whenever the
+  workspace's tasks were re-read from disk (e.g. changed by another
+  process). Equal versions therefore always mean equal tasks.
+- Every change is recorded as a small delta (the operation and the task
+  it left behind), so open pages can follow changes through the /events
+  stream instead of re-fetching whole task lists. A client that falls
+  further behind than FEED_SIZE events is told to reload.
+
+The feed is shared by all processes (e.g. the pre-fork workers) through
+a change log next to todo.json: a header line naming the feed, then one
+event per line with increasing sequence numbers. Writers append under a
+file lock after reading what other processes appended; each process
+keeps the last FEED_SIZE events in memory and polls the log for new ones
+while clients wait. Once the log holds twice that many events, a writer
+replaces it with the newest FEED_SIZE (same feed). A deleted log starts
+a new feed, and clients of the old one are told to reload.
+"""
+
+from collections import deque
+from pathlib import Path
+import json
+import os
+import threading
+import time
+import uuid
+
+from backend.todo.operations import touched_workspaces
+from backend.todo.storage import DATA_FILE
+from backend.utils.atomic_write import atomic_write_bytes
+from backend.utils.file_lock import FileLock
+from backend.utils.lifecycle import stopping
+
+FEED_SIZE = 1000
+CHANGES_FILE = DATA_FILE.with_name("todo.changes.jsonl")
+
+# Seconds between checks of the change log for other processes' events
+POLL_INTERVAL = 0.5
+
+
+def _token() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class ChangeFeed:
+    def __init__(self, path: Path = CHANGES_FILE, size: int = FEED_SIZE):
+        self.path = Path(path)
+        self.size = size
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=size)
+        self._seq = 0
+        self.feed_id = None  # from the log header; None until it was read
+        self._file = None  # (inode, bytes read) of the log
+        self._logged = 0  # events in the log file
+        self._versions = {}  # workspace -> [task ID map, token, counter]
+
+    # -----------------------------
+    # Versions
+    # -----------------------------
+
+    def version(self, workspace: str, ids: dict) -> str:
+        """Current version of a workspace whose task ID map is `ids`."""
+        with self._cond:
+            entry = self._versions.get(workspace)
+            if entry is None or entry[0] is not ids:
+                entry = self._versions[workspace] = [ids, _token(), 0]
+            return f"{entry[1]}-{entry[2]}"
+
+    def _bump(self, workspace: str, ids: dict | None, previous: dict | None) -> None:
+        """Follow a workspace from task ID map `previous` to `ids`."""
+        entry = self._versions.get(workspace)
+        if ids is None:
+            self._versions.pop(workspace, None)
+        elif entry is None or entry[0] is not previous:
+            self._versions[workspace] = [ids, _token(), 0]
+        else:
+            entry[0] = ids
+            entry[2] += 1
+
+    # -----------------------------
+    # Change log
+    # -----------------------------
+
+    def _sync(self) -> None:
+        """Read the events appended to the log since the last call. Hold self._cond."""
+        try:
+            with open(self.path, "rb") as f:
+                st = os.fstat(f.fileno())
+                inode, offset = self._file or (None, 0)
+                if st.st_ino != inode or st.st_size < offset:
+                    offset = 0  # replaced: read it from the start
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            self._file = None
+            return
+
+        # A line still being written is read next time
+        chunk = chunk[:chunk.rfind(b"\n") + 1]
+        lines = chunk.splitlines()
+
+        if offset == 0:
+            try:
+                feed_id = json.loads(lines[0])["feed"]
+            except (IndexError, ValueError, KeyError, TypeError):
+                return  # no complete header (yet): the next writer replaces it
+            if feed_id != self.feed_id:
+                self.feed_id, self._seq = feed_id, 0
+                self._events.clear()
+            self._logged = 0
+            lines = lines[1:]
+
+        fresh = False
+        for line in lines:
+            try:
+                event = json.loads(line)
+                seq = event["seq"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            self._logged += 1
+            if seq > self._seq:
+                self._events.append(event)
+                self._seq = seq
+                fresh = True
+
+        self._file = (st.st_ino, offset + len(chunk))
+        if fresh:
+            self._cond.notify_all()
+
+    def _rewrite(self) -> None:
+        """Replace the log with the events in memory. Hold the file lock and self._cond."""
+        raw = _dumps({"feed": self.feed_id}) + b"".join(_dumps(e) for e in self._events)
+        atomic_write_bytes(self.path, raw)
+        self._file = (self.path.stat().st_ino, len(raw))
+        self._logged = len(self._events)
+
+    def _append(self, events: list[dict]) -> None:
+        """Append events to the log. Hold the file lock and self._cond."""
+        with open(self.path, "ab") as f:
+            if f.tell() != self._file[1]:
+                f.write(b"\n")  # end a line torn by a crash
+            f.write(b"".join(_dumps(e) for e in events))
+            self._file = (os.fstat(f.fileno()).st_ino, f.tell())
+        self._logged += len(events)
+
+    def _open_log(self) -> None:
+        """Read the log, starting a new feed if there is none. Hold the file lock and self._cond."""
+        self._sync()
+        if self._file is None:
+            self.feed_id, self._seq = _token(), 0
+            self._events.clear()
+            self._rewrite()
+
+    def _record(self, events: list[dict]) -> None:
+        with FileLock(str(self.path)), self._cond:
+            try:
+                self._open_log()
+                for event in events:
+                    self._seq += 1
+                    event["seq"] = self._seq
+                    self._events.append(event)
+
+                if self._logged + len(events) > 2 * self.size:
+                    self._rewrite()
+                else:
+                    self._append(events)
+            except Exception:
+                # Memory may be ahead of the log now: re-read it next time
+                self.feed_id = self._file = None
+                raise
+            finally:
+                self._cond.notify_all()
+
+    # -----------------------------
+    # Feed
+    # -----------------------------
+
+    def on_ops(self, data: dict, ids: dict, ops: list[dict], previous: dict) -> None:
+        """Storage listener: record a persisted batch of operations."""
+        with self._cond:
+            for workspace in touched_workspaces(ops):
+                self._bump(workspace, ids.get(workspace), previous.get(workspace))
+
+        events = []
+        for op in ops:
+            name = op["op"]
+            event = {"op": name}
+
+            if name in ("add_workspace", "remove_workspace"):
+                event["workspace"] = op["name"]
+            else:
+                workspace = op["workspace"]
+                target = op.get("to_workspace") or workspace
+                task = ids.get(target, {}).get(op["id"])
+                event.update(
+                    workspace=workspace,
+                    id=op["id"],
+                    task=dict(task) if task is not None and name != "remove_task" else None,
+                )
+                if name == "move_task":
+                    event.update(to_workspace=target, position=op.get("position"))
+            events.append(event)
+
+        self._record(events)
+
+    def _position(self) -> str:
+        return f"{self.feed_id}:{self._seq}"
+
+    def position(self, last_event_id: str | None) -> str | None:
+        """
+        Position to resume after, from a client's Last-Event-ID (positions
+        are event IDs). None means the client missed events and must
+        reload; without an ID the client starts from now.
+        """
+        with self._cond:
+            self._sync()
+        if self.feed_id is None:
+            with FileLock(str(self.path)), self._cond:
+                self._open_log()
+
+        with self._cond:
+            if not last_event_id:
+                return self._position()
+
+            feed_id, _, seq = last_event_id.partition(":")
+            if feed_id != self.feed_id or not seq.isdigit() or int(seq) > self._seq:
+                return None
+            oldest = self._events[0]["seq"] if self._events else self._seq + 1
+            if int(seq) < oldest - 1:
+                return None
+            return last_event_id
+
+    def wait(self, after: str, timeout: float) -> tuple[list[dict] | None, str]:
+        """
+        Wait up to `timeout` seconds for events newer than position `after`.
+        Return them (None if some were missed) and the new position.
+        Returns early, without events, once the server is stopping.
+        """
+        feed_id, _, seq = after.partition(":")
+        seq = int(seq)
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                self._sync()
+                if self.feed_id != feed_id or self._seq != seq:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or stopping.is_set():
+                    return [], after
+                self._cond.wait(min(remaining, POLL_INTERVAL))
+
+            if self.feed_id != feed_id or self._seq < seq:
+                return None, self._position()
+            if not self._events or self._events[0]["seq"] > seq + 1:
+                return None, self._position()
+            return [e for e in self._events if e["seq"] > seq], self._position()
+
+    def event_id(self, event: dict) -> str:
+        return f"{self.feed_id}:{event['seq']}"
+
+
+change_feed = ChangeFeed()
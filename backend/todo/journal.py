@@ -0,0 +1,99 @@
+# backend/todo/journal.py
+
+"""
+Append-only journal of todo mutations.
+
+Each line of the journal is one JSON document. The first line is a
+header naming the snapshot (todo.json) the journal applies to; every
+following line is a transaction: a list of operations that were applied
+together.
+
+Tying the journal to a snapshot makes compaction crash-safe: once a new
+snapshot is written, the old journal no longer matches it and is
+ignored, even if it could not be removed yet.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+def snapshot_id(raw: bytes | None) -> str:
+    """Identify a snapshot by its content ("empty" when there is none)."""
+    if raw is None:
+        return "empty"
+    return hashlib.sha1(raw).hexdigest()
+
+
+def read_transactions(path: Path, snapshot: str) -> list[list[dict]]:
+    """
+    Return the transactions logged on top of `snapshot`, oldest first.
+
+    A journal written for another snapshot is ignored, and so is a torn
+    (half-written) line left by a crash during an append.
+    """
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return []
+
+    if not lines:
+        return []
+
+    try:
+        header = json.loads(lines[0])
+    except json.JSONDecodeError:
+        return []
+
+    if header.get("snapshot") != snapshot:
+        return []
+
+    transactions = []
+    for line in lines[1:]:
+        if not line.strip():
+            continue
+        try:
+            transactions.append(json.loads(line)["ops"])
+        except (json.JSONDecodeError, KeyError, TypeError):
+            continue
+
+    return transactions
+
+
+def append_transaction(path: Path, snapshot: str, ops: list[dict]) -> None:
+    """Durably append one transaction, starting a new journal if needed."""
+    with open(path, "ab") as f:
+        size = f.tell()
+        lines = []
+
+        if size == 0:
+            lines.append(json.dumps({"snapshot": snapshot}))
+        elif not _ends_with_newline(path, size):
+            # Terminate a torn line so this transaction starts cleanly
+            lines.append("")
+
+        lines.append(json.dumps({"ops": ops}, separators=(",", ":")))
+
+        f.write(("\n".join(lines) + "\n").encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def count_transactions(path: Path) -> int:
+    """Number of transactions in the journal (header excluded)."""
+    try:
+        with open(path, "rb") as f:
+            return max(sum(1 for line in f if line.strip()) - 1, 0)
+    except FileNotFoundError:
+        return 0
+
+
+def remove_journal(path: Path) -> None:
+    path.unlink(missing_ok=True)
+
+
+def _ends_with_newline(path: Path, size: int) -> bool:
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1) == b"\n"
@@ -0,0 +1,245 @@
+# backend/todo/operations.py
+
+"""
+Operations on the to-do document.
+
+The document maps workspace names to lists of tasks, and each task has
+a stable "id". Alongside it lives a map of workspace -> {task id -> task}
+for constant-time lookups. Every change is an operation, a dict with an
+"op" name and its arguments (see OPERATIONS), applied to both in place.
+
+The storage keeps the current document in memory for readers, so a
+batch is applied to a copy of it (see copy_workspaces) that only
+replaces the cached one once the batch has been persisted. Cached
+workspaces are frozen (see freeze_tasks): changing them raises TypeError.
+
+The storage backends only ever pass the workspaces an operation touches
+(see touched_workspaces), so handlers must not look at other ones.
+"""
+
+import uuid
+
+
+class TaskNotFoundError(LookupError):
+    """No task with the requested ID exists in the workspace."""
+
+
+def new_task_id() -> str:
+    return uuid.uuid4().hex
+
+
+def index_tasks(data):
+    """
+    Build the workspace -> {task id -> task} map, giving an ID to tasks
+    that have none. Return the map and whether any ID was assigned.
+    """
+    ids = {}
+    assigned = False
+
+    for workspace, tasks in data.items():
+        ids[workspace] = {}
+        for task in tasks:
+            if not task.get("id") or task["id"] in ids[workspace]:
+                task["id"] = new_task_id()
+                assigned = True
+            ids[workspace][task["id"]] = task
+
+    return ids, assigned
+
+
+class ReadOnlyTask(dict):
+    """A task of the cached document; reads like a dict, can't be changed."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Cached tasks are read-only: change them with storage.apply_ops()")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+
+def freeze_tasks(tasks):
+    """Return the tasks of a workspace as a tuple of ReadOnlyTask, and its task ID map."""
+    tasks = tuple(task if type(task) is ReadOnlyTask else ReadOnlyTask(task) for task in tasks)
+    return tasks, {task["id"]: task for task in tasks}
+
+
+def copy_workspaces(data, ids, names):
+    """
+    Return copies of the document and its task ID map in which the
+    workspaces `names` (their lists, tasks and ID maps) can be changed
+    without affecting the originals (frozen ones become plain lists and
+    dicts again). Other workspaces are shared.
+    """
+    data = dict(data)
+    ids = dict(ids)
+    for name in names:
+        if name in data:
+            tasks = data[name] = [dict(task) for task in data[name]]
+            ids[name] = {task["id"]: task for task in tasks}
+    return data, ids
+
+
+# -----------------------------
+# Operations
+# -----------------------------
+
+def _workspace_tasks(data, name):
+    if name not in data:
+        raise ValueError("Workspace does not exist")
+    return data[name]
+
+
+def _find_task(data, ids, op):
+    """
+    Locate the task an operation targets, by "id" or by list "index".
+    The resolved ID is stored in the op, so listeners and journal
+    replays see which task was meant.
+    """
+    tasks = _workspace_tasks(data, op["workspace"])
+
+    if op.get("id") is not None:
+        task = ids[op["workspace"]].get(op["id"])
+        if task is None:
+            raise TaskNotFoundError("Task not found")
+        return task
+
+    try:
+        task = tasks[op["index"]]
+    except IndexError:
+        raise IndexError("Task index out of range")
+    op["id"] = task["id"]
+    return task
+
+
+def _add_workspace(data, ids, op):
+    if op["name"] in data:
+        raise ValueError("Workspace already exists")
+    data[op["name"]] = []
+    ids[op["name"]] = {}
+
+
+def _remove_workspace(data, ids, op):
+    _workspace_tasks(data, op["name"])
+    del data[op["name"]]
+    del ids[op["name"]]
+
+
+def _add_task(data, ids, op):
+    tasks = _workspace_tasks(data, op["workspace"])
+    if not op.get("title"):
+        raise ValueError("Task title is required")
+
+    # The generated ID is stored in the op so a journal replay reuses it
+    task_id = op.setdefault("id", new_task_id())
+    if task_id in ids[op["workspace"]]:
+        raise ValueError("Task ID already exists")
+
+    task = {"id": task_id, "title": op["title"], "description": op.get("description", "")}
+    tasks.append(task)
+    ids[op["workspace"]][task_id] = task
+
+
+def _remove_task(data, ids, op):
+    task = _find_task(data, ids, op)
+    tasks = data[op["workspace"]]
+
+    # Compare by identity: tasks are dicts, list.remove() would match by value
+    position = next(i for i, t in enumerate(tasks) if t is task)
+    del tasks[position]
+    del ids[op["workspace"]][task["id"]]
+
+
+def _move_task(data, ids, op):
+    """Move a task to `to_workspace` (default: the same one) at `position` (default: end)."""
+    task = _find_task(data, ids, op)
+    target = op.get("to_workspace") or op["workspace"]
+    target_tasks = _workspace_tasks(data, target)
+    if target != op["workspace"] and task["id"] in ids[target]:
+        raise ValueError("Task ID already exists")
+    position = op.get("position")
+    if position is not None and not isinstance(position, int):
+        raise ValueError("Task position must be an integer")
+
+    tasks = data[op["workspace"]]
+    del tasks[next(i for i, t in enumerate(tasks) if t is task)]
+    del ids[op["workspace"]][task["id"]]
+
+    if position is None:
+        target_tasks.append(task)
+    else:
+        target_tasks.insert(position, task)
+    ids[target][task["id"]] = task
+
+
+def _edit_task(data, ids, op):
+    task = _find_task(data, ids, op)
+    if op.get("title") is not None:
+        task["title"] = op["title"]
+    if op.get("description") is not None:
+        task["description"] = op["description"]
+
+
+OPERATIONS = {
+    "add_workspace": _add_workspace,
+    "remove_workspace": _remove_workspace,
+    "add_task": _add_task,
+    "remove_task": _remove_task,
+    "edit_task": _edit_task,
+    "move_task": _move_task,
+}
+
+
+def apply_op(data, ids, op):
+    """
+    Apply one operation (a dict with an "op" name and its arguments) to
+    the document and its task ID map in place. Tasks are addressed by
+    "id" or, for older clients, by list "index".
+
+    Raises ValueError/LookupError if the operation is invalid.
+    """
+    try:
+        handler = OPERATIONS[op["op"]]
+    except (KeyError, TypeError):
+        raise ValueError(f"Unknown operation: {op!r}")
+
+    try:
+        handler(data, ids, op)
+    except KeyError as e:
+        # A required argument is missing from the op
+        raise ValueError(f"Missing field {e} in operation {op['op']}")
+    except TypeError:
+        raise ValueError(f"Invalid arguments for operation {op['op']}")
+
+
+def apply_batch(data, ids, ops):
+    """
+    Apply a list of operations in order. In a batch of several, errors
+    name the failing operation.
+    """
+    for position, op in enumerate(ops):
+        try:
+            apply_op(data, ids, op)
+        except (ValueError, LookupError) as e:
+            if len(ops) > 1:
+                e.args = (f"Operation {position}: {e}",)
+            raise
+
+
+def touched_workspaces(ops) -> list[str]:
+    """Names of the workspaces a list of operations reads or changes."""
+    names = {}
+    for op in ops:
+        if not isinstance(op, dict):
+            continue
+        for field in ("name", "workspace", "to_workspace"):
+            if isinstance(op.get(field), str):
+                names[op[field]] = None
+    return list(names)
+
+
+def changes_workspaces(ops) -> bool:
+    """Whether the operations add or remove workspaces."""
+    return any(
+        isinstance(op, dict) and op.get("op") in ("add_workspace", "remove_workspace")
+        for op in ops
+    )
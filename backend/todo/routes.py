@@ -7,11 +7,33 @@ Provides RESTful API endpoints for workspaces and tasks.
 All routes return JSON responses with success/error messages.
 """
 
-from flask import Blueprint, request, jsonify
+import json
+import threading
+import time
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from backend.todo import service
+from backend.todo.change_feed import change_feed
+from backend.todo.operations import TaskNotFoundError
+from backend.utils.lifecycle import stopping
 
 todo_bp = Blueprint("todo", __name__, url_prefix="/api/todo")
 
+# Seconds between keep-alive comments on the event stream
+EVENTS_KEEPALIVE = 15
+
+# Seconds an event stream stays open before it ends and the browser
+# reconnects (with Last-Event-ID), so no stream holds a thread for good
+EVENTS_MAX_AGE = 300
+
+# Milliseconds the browser waits before reconnecting to a stream that
+# was turned away because too many are open (see SERVER_EVENT_STREAMS)
+EVENTS_BUSY_RETRY = 15000
+
+# Event streams open in this process
+_streams = {"open": 0}
+_streams_lock = threading.Lock()
+
 # -----------------------------
 # Workspace Endpoints
 # -----------------------------
@@ -55,12 +77,56 @@ def remove_workspace(name):
 # Task Endpoints
 # -----------------------------
 
+def _limit_arg():
+    """Parse the optional ?limit= query parameter (ValueError if invalid)."""
+    limit = request.args.get("limit")
+    if limit is None:
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return limit
+
+
 @todo_bp.route("/tasks/<workspace>", methods=["GET"])
 def get_tasks(workspace):
-    """Return all tasks from a workspace."""
+    """
+    Return the tasks of a workspace.
+
+    Query parameters (all optional):
+        limit: page size; the response then carries "next_cursor"
+        cursor: "next_cursor" of the previous page
+        title, description: keep tasks whose field contains the text
+    """
     try:
-        tasks = service.get_tasks(workspace)
-        return jsonify({"success": True, "tasks": tasks})
+        # Taken before reading the tasks: if they change in between, the
+        # client just gets a stale ETag and a full response next time
+        etag = service.tasks_version(workspace)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        filters = {
+            field: request.args[field]
+            for field in service.FILTER_FIELDS
+            if field in request.args
+        }
+        tasks, next_cursor = service.list_tasks(
+            workspace,
+            limit=_limit_arg(),
+            cursor=request.args.get("cursor"),
+            filters=filters,
+        )
+        response = jsonify({"success": True, "tasks": tasks, "next_cursor": next_cursor})
+        response.set_etag(etag)
+        # Cache, but always revalidate with If-None-Match
+        response.headers["Cache-Control"] = "no-cache"
+        return response
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -76,14 +142,74 @@ def add_task(workspace):
     if not title:
         return jsonify({"success": False, "error": "Task title is required"}), 400
     try:
-        service.add_task(workspace, title, description)
+        task_id = service.add_task(workspace, title, description)
+        return jsonify({"success": True, "id": task_id})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@todo_bp.route("/tasks/<workspace>/search", methods=["GET"])
+def search_tasks(workspace):
+    """Return the tasks containing every word of ?q= (titles and descriptions)."""
+    query = request.args.get("q", "")
+    if not query.strip():
+        return jsonify({"success": False, "error": "Search query is required"}), 400
+    try:
+        tasks = service.search_tasks(workspace, query, limit=_limit_arg())
+        return jsonify({"success": True, "tasks": tasks})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@todo_bp.route("/tasks/<workspace>/id/<task_id>", methods=["GET"])
+def get_task(workspace, task_id):
+    """Return a single task by ID."""
+    try:
+        task = service.get_task(workspace, task_id)
+        return jsonify({"success": True, "task": task})
+    except TaskNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@todo_bp.route("/tasks/<workspace>/id/<task_id>", methods=["PUT"])
+def edit_task_by_id(workspace, task_id):
+    """Edit a task by ID."""
+    data = request.get_json()
+    try:
+        service.edit_task_by_id(workspace, task_id, data.get("title"), data.get("description"))
+        return jsonify({"success": True})
+    except TaskNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@todo_bp.route("/tasks/<workspace>/id/<task_id>", methods=["DELETE"])
+def remove_task_by_id(workspace, task_id):
+    """Remove a task by ID from a workspace."""
+    try:
+        service.remove_task_by_id(workspace, task_id)
         return jsonify({"success": True})
+    except TaskNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+# Index-based routes, kept for older clients
+
 @todo_bp.route("/tasks/<workspace>/<int:index>", methods=["DELETE"])
 def remove_task(workspace, index):
     """Remove a task by index from a workspace."""
@@ -106,3 +232,121 @@ def api_edit_task(workspace, index):
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
+
+
+# -----------------------------
+# Change Feed
+# -----------------------------
+
+@todo_bp.route("/events", methods=["GET"])
+def events():
+    """
+    Server-Sent Events stream of changes ("change" events carrying one
+    delta each). ?workspace= limits it to one workspace. A "reset" event
+    means changes were missed and the client should reload.
+
+    The stream ends after EVENTS_MAX_AGE seconds, or as soon as the
+    server is stopping, with the ID of the last change it saw; the
+    browser resumes from there on reconnect. Each open stream holds a
+    server thread, so past SERVER_EVENT_STREAMS per process new ones are
+    told to retry later.
+    """
+    workspace = request.args.get("workspace")
+    last_event_id = request.headers.get("Last-Event-ID")
+    max_streams = current_app.config.get("SERVER_EVENT_STREAMS") or 0
+
+    with _streams_lock:
+        busy = max_streams and _streams["open"] >= max_streams
+        if not busy:
+            _streams["open"] += 1
+
+    if busy:
+        # A 200 with a long retry: the browser would give up after an error status
+        body = f"retry: {EVENTS_BUSY_RETRY}\n\n"
+        return Response(body, mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    def stream():
+        position = change_feed.position(last_event_id)
+        closes_at = time.monotonic() + EVENTS_MAX_AGE
+        yield "retry: 3000\n\n"
+
+        while True:
+            if position is None:
+                yield "event: reset\ndata: {}\n\n"
+                position = change_feed.position(None)
+
+            remaining = closes_at - time.monotonic()
+            if remaining <= 0 or stopping.is_set():
+                # An ID without data only moves the client's Last-Event-ID,
+                # past the changes of other workspaces this stream skipped
+                yield f"retry: 1000\nid: {position}\n\n"
+                return
+
+            changes, position = change_feed.wait(position, timeout=min(EVENTS_KEEPALIVE, remaining))
+            if changes is None:
+                position = None
+                continue
+            if not changes:
+                yield ": keep-alive\n\n"
+                continue
+
+            for event in changes:
+                if workspace and workspace not in (event["workspace"], event.get("to_workspace")):
+                    continue
+                yield (
+                    f"id: {change_feed.event_id(event)}\n"
+                    f"event: change\n"
+                    f"data: {json.dumps(event)}\n\n"
+                )
+
+    response = Response(stream_with_context(stream()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.call_on_close(_close_stream)
+    return response
+
+
+def _close_stream():
+    with _streams_lock:
+        _streams["open"] -= 1
+
+
+# -----------------------------
+# Bulk Endpoint
+# -----------------------------
+
+@todo_bp.route("/bulk", methods=["POST"])
+def bulk():
+    """
+    Apply many operations at once, all or nothing.
+
+    Body: {"ops": [{"op": "add_task", "workspace": ..., "title": ...}, ...]}
+    Supported ops: add_workspace, remove_workspace, add_task, edit_task,
+    remove_task and move_task (tasks addressed by "id" or "index";
+    move_task takes "to_workspace" and "position").
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        ids = service.apply_bulk(data.get("ops"))
+        return jsonify({"success": True, "ids": ids})
+    except TaskNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except (ValueError, IndexError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -----------------------------
+# Export
+# -----------------------------
+
+@todo_bp.route("/export", methods=["GET"])
+def export_todo():
+    """Download all workspaces and tasks as a pretty-printed JSON file."""
+    try:
+        response = Response(service.export_json(), mimetype="application/json")
+        response.headers.set("Content-Disposition", "attachment", filename="todo.json")
+        return response
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
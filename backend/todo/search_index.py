@@ -0,0 +1,159 @@
+# backend/todo/search_index.py
+
+"""
+In-memory inverted index over task titles and descriptions.
+
+For every workspace the index maps each word to the IDs of the tasks
+containing it, so a query only touches the postings of its own words
+instead of scanning every task.
+
+The index follows the storage cache one workspace at a time, checking
+against the task ID map it was built from: a batch of operations gives
+the workspaces it touches new maps, and the index is updated
+incrementally when it was built from the maps the batch replaced (see
+storage.add_listener). A workspace whose tasks were re-read from disk
+or replaced otherwise is re-indexed on its next search.
+"""
+
+import re
+import threading
+
+from backend.todo.operations import touched_workspaces
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> set[str]:
+    """Lower-cased words of `text`."""
+    return set(TOKEN_RE.findall((text or "").lower()))
+
+
+def _task_tokens(task: dict) -> set[str]:
+    return tokenize(task.get("title")) | tokenize(task.get("description"))
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources = {}  # workspace -> task ID map it was indexed from
+        self._postings = {}  # workspace -> {word -> {task id: None}}
+        self._tokens = {}  # workspace -> {task id -> words}
+
+    # -----------------------------
+    # Maintenance
+    # -----------------------------
+
+    def _rebuild(self, workspace: str, tasks: list, ids: dict) -> None:
+        self._postings[workspace] = {}
+        self._tokens[workspace] = {}
+        for task in tasks:
+            self._add(workspace, task)
+        self._sources[workspace] = ids
+
+    def _drop(self, workspace: str) -> None:
+        self._sources.pop(workspace, None)
+        self._postings.pop(workspace, None)
+        self._tokens.pop(workspace, None)
+
+    def _add(self, workspace: str, task: dict) -> None:
+        words = _task_tokens(task)
+        self._tokens[workspace][task["id"]] = words
+        postings = self._postings[workspace]
+        for word in words:
+            # dicts as ordered sets keep results in insertion order
+            postings.setdefault(word, {})[task["id"]] = None
+
+    def _remove(self, workspace: str, task_id: str) -> None:
+        words = self._tokens[workspace].pop(task_id, ())
+        postings = self._postings[workspace]
+        for word in words:
+            ids = postings.get(word)
+            if ids is None:
+                continue
+            ids.pop(task_id, None)
+            if not ids:
+                del postings[word]
+
+    def _reindex(self, workspace: str, ids: dict, task_id: str) -> None:
+        self._remove(workspace, task_id)
+        task = ids.get(task_id)
+        if task is not None:
+            self._add(workspace, task)
+
+    def on_ops(self, data: dict, ids: dict, ops: list[dict], previous: dict) -> None:
+        """
+        Storage listener: apply a persisted batch of operations. `data`
+        and `ids` hold (at least) every workspace the batch touched, and
+        `previous` their task ID maps before it.
+        """
+        with self._lock:
+            for workspace in touched_workspaces(ops):
+                source = self._sources.get(workspace)
+                if source is not None and source is previous.get(workspace) and workspace in ids:
+                    self._sources[workspace] = ids[workspace]
+                else:
+                    # Not indexed, indexed from older tasks, or removed
+                    self._drop(workspace)
+
+            for op in ops:
+                name = op["op"]
+
+                if name in ("add_workspace", "remove_workspace"):
+                    # Indexed lazily on the first search
+                    self._drop(op["name"])
+                    continue
+
+                workspace = op["workspace"]
+                target = op.get("to_workspace") or workspace
+
+                # Workspaces that aren't indexed are skipped
+                if name == "move_task":
+                    if workspace in self._sources:
+                        self._remove(workspace, op["id"])
+                    if target in self._sources:
+                        self._reindex(target, ids[target], op["id"])
+                elif name in ("add_task", "edit_task", "remove_task"):
+                    if workspace in self._sources:
+                        self._reindex(workspace, ids[workspace], op["id"])
+                else:
+                    self._drop(workspace)
+                    self._drop(target)
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+
+    def search(self, workspace: str, tasks: list, ids: dict, query: str,
+               limit: int | None = None) -> list[dict]:
+        """
+        Return the tasks of `workspace` containing every word of `query`,
+        in the order they were indexed.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+
+        with self._lock:
+            if self._sources.get(workspace) is not ids:
+                self._rebuild(workspace, tasks, ids)
+
+            postings = self._postings[workspace]
+            lists = [postings.get(word) for word in words]
+            if not all(lists):
+                return []
+
+            # Walk the shortest posting list, check the others by lookup
+            lists.sort(key=len)
+            matches = []
+            for task_id in lists[0]:
+                if all(task_id in other for other in lists[1:]):
+                    task = ids.get(task_id)
+                    if task is None:
+                        continue  # not in this version of the workspace
+                    matches.append(task)
+                    if limit is not None and len(matches) >= limit:
+                        break
+            return matches
+
+
+task_index = SearchIndex()
@@ -3,9 +3,29 @@
 """
 Business logic for the To-Do app.
 Operates on workspaces and tasks using storage.py.
+
+Tasks are addressed by their stable ID. The index-based functions are
+kept for older clients; an index shifts whenever an earlier task is
+removed.
 """
 
-from backend.todo.storage import load_data, save_data
+from backend.todo.change_feed import change_feed
+from backend.todo.search_index import task_index
+from backend.todo.storage import (
+    add_listener,
+    apply_ops,
+    export_data,
+    find_task,
+    list_workspaces,
+    load_workspace,
+)
+
+MAX_PAGE_SIZE = 500
+MAX_BULK_OPS = 10_000
+FILTER_FIELDS = ("title", "description")
+
+add_listener(task_index.on_ops)
+add_listener(change_feed.on_ops)
 
 # -----------------------------
 # Workspaces
@@ -13,70 +33,164 @@ from backend.todo.storage import load_data, save_data
 
 def get_workspaces():
     """Return a list of all workspace names."""
-    data = load_data()
-    return list(data.keys())
+    return list_workspaces()
 
 def add_workspace(name: str):
     """Add a new workspace."""
-    data = load_data()
-    if name in data:
-        raise ValueError("Workspace already exists")
-    data[name] = []
-    save_data(data)
+    apply_ops([{"op": "add_workspace", "name": name}])
 
 def remove_workspace(name: str):
     """Remove an existing workspace."""
-    data = load_data()
-    if name not in data:
-        raise ValueError("Workspace does not exist")
-    del data[name]
-    save_data(data)
+    apply_ops([{"op": "remove_workspace", "name": name}])
 
 # -----------------------------
 # Tasks
 # -----------------------------
 
+def tasks_version(workspace: str) -> str:
+    """Version of a workspace's tasks; changes whenever they change."""
+    _, ids = load_workspace(workspace)
+    return change_feed.version(workspace, ids)
+
 def get_tasks(workspace: str):
     """Return tasks in a workspace."""
-    data = load_data()
-    if workspace not in data:
-        raise ValueError("Workspace does not exist")
-    return data[workspace]
-
-def add_task(workspace: str, title: str, description: str = ""):
-    """Add a task to a workspace."""
-    data = load_data()
-    if workspace not in data:
-        raise ValueError("Workspace does not exist")
-    data[workspace].append({"title": title, "description": description})
-    save_data(data)
+    tasks, _ = load_workspace(workspace)
+    return tasks
+
+def _cursor_position(tasks, cursor: str) -> int:
+    """
+    Position right after the task named by `cursor` ("<position>:<id>").
+    The position is only a hint: if earlier tasks were added or removed
+    since, the task is looked up by ID. If the task itself was removed,
+    the page continues from its old position.
+    """
+    hint, _, task_id = cursor.partition(":")
+    if not hint.isdigit():
+        raise ValueError("Invalid cursor")
+    hint = int(hint)
+    if hint < len(tasks) and tasks[hint]["id"] == task_id:
+        return hint + 1
+
+    for position, task in enumerate(tasks):
+        if task["id"] == task_id:
+            return position + 1
+    # Removed: the tasks after it moved up one place
+    return min(hint, len(tasks))
+
+def list_tasks(workspace: str, *, limit: int | None = None, cursor: str | None = None,
+               filters: dict | None = None):
+    """
+    Return a page of tasks and the cursor of the next page (None at the end).
+
+    Args:
+        limit: Maximum number of tasks (capped at MAX_PAGE_SIZE); None returns
+            every matching task.
+        cursor: The "next_cursor" of the previous page.
+        filters: Field name -> text; keeps tasks whose field contains the
+            text (case-insensitive).
+    """
+    # A snapshot: batches applied meanwhile replace it instead of changing it
+    tasks = get_tasks(workspace)
+    start = _cursor_position(tasks, cursor) if cursor else 0
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    needles = {
+        field: str(text).lower()
+        for field, text in (filters or {}).items()
+        if field in FILTER_FIELDS and text
+    }
+
+    page = []
+    for position in range(start, len(tasks)):
+        task = tasks[position]
+        # Fields may hold other JSON values (e.g. a null description)
+        if any(text not in str(task.get(field) or "").lower() for field, text in needles.items()):
+            continue
+        if limit is not None and len(page) == limit:
+            # Another task matches: the page after this one isn't empty
+            last = page[-1]
+            return page, f"{last_position}:{last['id']}"
+        page.append(task)
+        last_position = position
+
+    return page, None
+
+def search_tasks(workspace: str, query: str, limit: int | None = None):
+    """Return the tasks containing every word of `query`, using the search index."""
+    tasks, ids = load_workspace(workspace)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return task_index.search(workspace, tasks, ids, query, limit)
+
+def get_task(workspace: str, task_id: str):
+    """Return a single task by ID."""
+    return find_task(workspace, task_id)
+
+def add_task(workspace: str, title: str, description: str = "") -> str:
+    """Add a task to a workspace and return its ID."""
+    op = {
+        "op": "add_task",
+        "workspace": workspace,
+        "title": title,
+        "description": description,
+    }
+    apply_ops([op])
+    return op["id"]
+
+def remove_task_by_id(workspace: str, task_id: str):
+    """Remove a task by ID from a workspace."""
+    apply_ops([{"op": "remove_task", "workspace": workspace, "id": task_id}])
+
+def edit_task_by_id(workspace: str, task_id: str, title: str = None, description: str = None):
+    """Edit the title and/or description of a task by ID."""
+    apply_ops([{
+        "op": "edit_task",
+        "workspace": workspace,
+        "id": task_id,
+        "title": title,
+        "description": description,
+    }])
 
 def remove_task(workspace: str, index: int):
     """Remove a task by index from a workspace."""
-    data = load_data()
-    if workspace not in data:
-        raise ValueError("Workspace does not exist")
-    try:
-        del data[workspace][index]
-    except IndexError:
-        raise IndexError("Task index out of range")
-    save_data(data)
+    apply_ops([{"op": "remove_task", "workspace": workspace, "index": index}])
 
 def edit_task(workspace: str, index: int, title: str = None, description: str = None):
     """Edit the title and/or description of a task."""
-    data = load_data()
-    if workspace not in data:
-        raise ValueError("Workspace does not exist")
-    try:
-        task = data[workspace][index]
-    except IndexError:
-        raise IndexError("Task index out of range")
-    
-    if title is not None:
-        task["title"] = title
-    if description is not None:
-        task["description"] = description
-
-    data[workspace][index] = task
-    save_data(data)
+    apply_ops([{
+        "op": "edit_task",
+        "workspace": workspace,
+        "index": index,
+        "title": title,
+        "description": description,
+    }])
+
+# -----------------------------
+# Bulk
+# -----------------------------
+
+def apply_bulk(ops) -> list:
+    """
+    Apply a list of operations (see storage.OPERATIONS) in one
+    transaction: one lock, one write, and nothing is saved if any
+    operation fails. Return the task ID each operation touched (None for
+    workspace operations), so imports learn the IDs of new tasks.
+    """
+    if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+        raise ValueError("ops must be a list of operation objects")
+    if not ops:
+        raise ValueError("No operations given")
+    if len(ops) > MAX_BULK_OPS:
+        raise ValueError(f"Too many operations (max {MAX_BULK_OPS})")
+
+    apply_ops(ops)
+    return [op.get("id") for op in ops]
+
+# -----------------------------
+# Export
+# -----------------------------
 
+def export_json() -> str:
+    """Return all workspaces and tasks as pretty-printed JSON."""
+    return export_data(indent=4)
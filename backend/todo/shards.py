@@ -0,0 +1,263 @@
+# backend/todo/shards.py
+
+"""
+Sharded to-do storage: one file per workspace.
+
+Layout of a user's directory (data/users/<user>/):
+
+    manifest.json           {"version": 1, "workspaces": {name: shard file}}
+    workspaces/<hex>.json   the tasks of one workspace
+
+Listing workspaces only reads the manifest, and a change to a single
+workspace only locks and rewrites its own shard, so writes to unrelated
+workspaces don't wait for each other; they hold the manifest shared so
+their workspace can't disappear under them.
+
+A batch that adds or removes workspaces or spans several of them locks
+the manifest exclusively instead. It writes the workspaces it changed
+to new shard files and then replaces the manifest, which switches over
+to all of them at once: a failure or crash before that rename leaves
+the previous shards in effect, so the batch is applied all or nothing.
+Shards no longer in the manifest (replaced, or left by an interrupted
+batch) are deleted afterwards.
+
+Locks are always taken in the same order (manifest, then shards sorted
+by file name), so concurrent writers can't deadlock. Every file is
+replaced atomically.
+"""
+
+from contextlib import ExitStack
+from pathlib import Path
+import json
+import threading
+import uuid
+
+from backend.todo.operations import (
+    apply_batch,
+    changes_workspaces,
+    copy_workspaces,
+    freeze_tasks,
+    index_tasks,
+    touched_workspaces,
+)
+from backend.utils.atomic_write import atomic_write_bytes
+from backend.utils.file_lock import FileLock
+
+MANIFEST_VERSION = 1
+
+
+def _file_signature(path):
+    """Identify the current file version; None if the file doesn't exist."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+class ShardStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.manifest_path = self.root / "manifest.json"
+        self.shard_dir = self.root / "workspaces"
+
+        self._lock = threading.Lock()
+        self._manifest = (None, None)  # (signature, workspace -> shard file)
+        self._shards = {}  # shard file -> (signature, tasks, task ID map)
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    def invalidate(self):
+        with self._lock:
+            self._manifest = (None, None)
+            self._shards.clear()
+
+    # -----------------------------
+    # Reading
+    # -----------------------------
+
+    def _manifest_lock(self, *, shared):
+        self.root.mkdir(parents=True, exist_ok=True)
+        return FileLock(str(self.manifest_path), shared=shared)
+
+    def _shard_lock(self, shard, *, shared):
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        return FileLock(str(self.shard_dir / shard), shared=shared)
+
+    def _read_manifest(self) -> dict:
+        """Workspace name -> shard file, re-read only when the file changed."""
+        signature = _file_signature(self.manifest_path)
+        with self._lock:
+            if self._manifest[0] == signature and self._manifest[1] is not None:
+                return self._manifest[1]
+
+            try:
+                manifest = json.loads(self.manifest_path.read_bytes())
+                workspaces = manifest["workspaces"]
+            except FileNotFoundError:
+                workspaces = {}
+
+            self._manifest = (signature, workspaces)
+            return workspaces
+
+    def _read_shard(self, shard):
+        """
+        Return (tasks, task ID map) of a shard, from memory when it did
+        not change, and whether tasks had to be given new IDs. The tasks
+        are frozen (see operations.freeze_tasks).
+        """
+        path = self.shard_dir / shard
+        signature = _file_signature(path)
+        with self._lock:
+            cached = self._shards.get(shard)
+            if cached and cached[0] == signature:
+                return cached[1], cached[2], False
+
+            try:
+                tasks = json.loads(path.read_bytes())
+            except FileNotFoundError:
+                tasks = []
+
+            _, assigned = index_tasks({shard: tasks})
+            tasks, ids = freeze_tasks(tasks)
+            if not assigned:
+                self._shards[shard] = (signature, tasks, ids)
+            return tasks, ids, assigned
+
+    def _write_shard(self, shard, tasks, ids):
+        """Write a shard and cache it; return its frozen tasks and task ID map."""
+        path = self.shard_dir / shard
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(path, _dumps(tasks))
+        tasks, ids = freeze_tasks(tasks)
+        with self._lock:
+            self._shards[shard] = (_file_signature(path), tasks, ids)
+        return tasks, ids
+
+    def _write_manifest(self, workspaces):
+        atomic_write_bytes(
+            self.manifest_path,
+            _dumps({"version": MANIFEST_VERSION, "workspaces": workspaces}),
+        )
+        with self._lock:
+            self._manifest = (_file_signature(self.manifest_path), workspaces)
+
+    def _remove_shard(self, shard):
+        """Delete a shard and its lock file. The manifest lock must be held
+        exclusively, so nobody else can be holding the shard lock."""
+        (self.shard_dir / shard).unlink(missing_ok=True)
+        (self.shard_dir / f"{shard}.lock").unlink(missing_ok=True)
+        with self._lock:
+            self._shards.pop(shard, None)
+
+    def workspaces(self) -> list[str]:
+        """Workspace names, read from the manifest only."""
+        with self._manifest_lock(shared=True):
+            return list(self._read_manifest())
+
+    def load_workspace(self, name):
+        """Return (tasks, task ID map) of one workspace."""
+        with self._manifest_lock(shared=True):
+            shard = self._read_manifest().get(name)
+            if shard is None:
+                raise ValueError("Workspace does not exist")
+
+            with self._shard_lock(shard, shared=True):
+                tasks, ids, assigned = self._read_shard(shard)
+            if not assigned:
+                return tasks, ids
+
+            # Tasks without IDs (edited by hand): save the IDs they were given
+            with self._shard_lock(shard, shared=False):
+                tasks, ids, assigned = self._read_shard(shard)
+                if assigned:
+                    tasks, ids = self._write_shard(shard, tasks, ids)
+                return tasks, ids
+
+    def load_all(self):
+        """Return the whole document and its task ID map (reads every shard)."""
+        data, ids = {}, {}
+        for name in self.workspaces():
+            try:
+                data[name], ids[name] = self.load_workspace(name)
+            except ValueError:
+                continue  # removed in between
+        return data, ids
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+
+    def _commit(self, manifest, data, ids, names):
+        """
+        Write the workspaces `names` to new shard files and switch the
+        manifest over to them in one rename, then delete the shards it
+        no longer lists. The manifest lock must be held exclusively.
+        """
+        manifest = dict(manifest)
+        for name in names:
+            if name in data:
+                manifest[name] = shard = f"{uuid.uuid4().hex}.json"
+                data[name], ids[name] = self._write_shard(shard, data[name], ids[name])
+            else:
+                manifest.pop(name, None)
+
+        self._write_manifest(manifest)
+
+        # Replaced shards, and new ones of batches that never got here
+        live = set(manifest.values())
+        for path in self.shard_dir.glob("*.json"):
+            if path.name not in live:
+                self._remove_shard(path.name)
+
+    def apply_ops(self, ops, on_applied=None):
+        """
+        Apply a list of operations, all or nothing, locking and rewriting
+        only the shards they touch. on_applied(data, ids, ops, previous)
+        is called with the locks held; `data` only holds the touched
+        workspaces and `previous` their task ID maps before the batch.
+
+        The cached shards are not changed in place: the batch is applied
+        to copies, which are only cached once written.
+        """
+        names = touched_workspaces(ops)
+        # Committed through the manifest (see the module docstring)
+        atomic = changes_workspaces(ops) or len(names) > 1
+
+        with ExitStack() as stack:
+            stack.enter_context(self._manifest_lock(shared=not atomic))
+            manifest = self._read_manifest()
+
+            if not atomic:
+                for shard in sorted({manifest[name] for name in names if name in manifest}):
+                    stack.enter_context(self._shard_lock(shard, shared=False))
+
+            current, previous = {}, {}
+            for name in names:
+                if name in manifest:
+                    current[name], previous[name], _ = self._read_shard(manifest[name])
+
+            data, ids = copy_workspaces(current, previous, names)
+            apply_batch(data, ids, ops)
+
+            if atomic:
+                self._commit(manifest, data, ids, names)
+            else:
+                for name in names:
+                    data[name], ids[name] = self._write_shard(manifest[name], data[name], ids[name])
+
+            if on_applied is not None:
+                on_applied(data, ids, ops, previous)
+
+    def import_document(self, data):
+        """Replace the whole store with `data` (workspace -> tasks)."""
+        data = dict(data)
+        ids, _ = index_tasks(data)
+
+        with self._manifest_lock(shared=False):
+            self._commit({}, data, ids, list(data))
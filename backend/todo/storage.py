@@ -2,26 +2,423 @@
 
 """
 Handles reading and writing the tasks/workspaces JSON.
+
+Changes are expressed as operations (see operations.py) and persisted
+in one of three modes:
+
+- "file": the document lives in todo.json (the snapshot); every change
+  rewrites it
+- "journal": changes are appended to todo.journal.jsonl and replayed on
+  load; once the journal reaches `compact_threshold` transactions, it is
+  folded into a new snapshot in the background
+- "sharded": one file per workspace plus a manifest under
+  data/users/<user>/ (see shards.py); todo.json is migrated into it on
+  first use and left in place as a backup
+
+The parsed document is kept in memory and only re-read when the files
+change on disk (mtime, size or inode differ), so read endpoints are
+served from memory. Files are written compactly; export_data() gives
+the pretty-printed form.
+
+Every task has a stable "id". Alongside the cached document, a map of
+workspace -> {task id -> task} gives constant-time lookups; operations
+keep it up to date. Tasks written by older versions get an ID (and the
+file is rewritten) the first time they are loaded.
+
+The cached document is never changed in place: a batch of operations is
+applied to a copy of the workspaces it touches, which replaces the
+cached one only after it has been written. Readers holding the previous
+document keep a consistent view of it. What load_data() and
+load_workspace() return is read-only (a mapping proxy, tuples of tasks
+and ReadOnlyTask dicts), so a caller changing it by mistake gets a
+TypeError instead of silently corrupting the cache.
+
+Readers take the file lock in shared mode and writers in exclusive mode.
+Snapshots are replaced atomically (write to a temp file, then rename),
+so a crash mid-save never leaves a truncated todo.json behind.
 """
 
+import hashlib
 import json
+import threading
 from pathlib import Path
+from types import MappingProxyType
+from backend.todo import journal
+from backend.todo.operations import (
+    TaskNotFoundError,
+    apply_batch,
+    apply_op,
+    copy_workspaces,
+    freeze_tasks,
+    index_tasks,
+    touched_workspaces,
+)
+from backend.todo.shards import ShardStore
+from backend.utils.atomic_write import atomic_write_bytes
 from backend.utils.file_lock import FileLock
+from backend.utils.metrics import stage
 
 DATA_FILE = Path(__file__).resolve().parent.parent.parent / "data" / "todo.json"
 DATA_FILE.parent.mkdir(exist_ok=True)  # garante que a pasta 'data' existe
 
+JOURNAL_FILE = DATA_FILE.with_name("todo.journal.jsonl")
+USERS_DIR = DATA_FILE.parent / "users"
+
+STORAGE_MODES = {"file", "journal", "sharded"}
+
+# Set from app config at startup (see configure)
+settings = {
+    "mode": "file",
+    "compact_threshold": 1000,
+    "user": "local",
+}
+
+# Parsed document, its task ID map, the file signature it was read from,
+# the id of its snapshot and how many journal transactions were replayed
+# on top of it
+_cache = {
+    "signature": None,
+    "data": None,
+    "ids": None,
+    "snapshot": None,
+    "journal_size": 0,
+}
+_cache_lock = threading.Lock()
+
+_compact_lock = threading.Lock()
+
+# ShardStore of the configured user (sharded mode)
+_shard_store = None
+_shard_store_lock = threading.Lock()
+
+# Called as callback(data, ids, ops, previous) after each persisted batch
+# of operations
+_listeners = []
+
+
+def add_listener(callback):
+    """
+    Register callback(data, ids, ops, previous), called with the file
+    lock held after a batch of operations was applied and persisted.
+    `previous` is the task ID map the batch was applied to; the touched
+    workspaces have new task ID maps in `ids`. Ops that address a task
+    by index also carry its resolved "id".
+    """
+    _listeners.append(callback)
+
+
+def configure(*, mode: str | None = None, compact_threshold: int | None = None,
+              user: str | None = None):
+    """Select the persistence mode, the journal compaction threshold and
+    the user whose shards are used in sharded mode."""
+    if user is not None:
+        if not user or user in (".", "..") or "/" in user or "\\" in user:
+            raise ValueError(f"Invalid todo user: {user!r}")
+        settings["user"] = user
+    if mode is not None:
+        if mode not in STORAGE_MODES:
+            raise ValueError(f"Invalid todo storage mode: {mode}")
+        settings["mode"] = mode
+    if compact_threshold is not None:
+        settings["compact_threshold"] = max(compact_threshold, 1)
+
+
+# -----------------------------
+# Loading
+# -----------------------------
+
+def _file_signature(path):
+    """Identify the current file version; None if the file doesn't exist."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _signature():
+    return (_file_signature(DATA_FILE), _file_signature(JOURNAL_FILE))
+
+
+def _read_document():
+    """Read the snapshot and replay the journal on top of it."""
+    try:
+        raw = DATA_FILE.read_bytes()
+    except FileNotFoundError:
+        raw = None
+
+    data = json.loads(raw) if raw else {}
+    ids, assigned = index_tasks(data)
+    snapshot = journal.snapshot_id(raw)
+    transactions = journal.read_transactions(JOURNAL_FILE, snapshot)
+
+    for t_index, ops in enumerate(transactions):
+        for o_index, op in enumerate(ops):
+            if isinstance(op, dict) and op.get("op") == "add_task" and not op.get("id"):
+                # Written before ops carried their ID: derive it from the
+                # entry's place, so every replay gives the task the same one
+                key = f"{snapshot}:{t_index}:{o_index}".encode()
+                op["id"] = hashlib.sha1(key).hexdigest()[:32]
+            try:
+                apply_op(data, ids, op)
+            except (ValueError, LookupError) as e:
+                print(f"Warning: skipping invalid journal entry {op!r}: {e}")
+
+    return data, ids, assigned, snapshot, len(transactions)
+
+
+def _freeze(data, ids):
+    """Freeze the workspaces of a document about to be cached, in place."""
+    for name, tasks in data.items():
+        if not isinstance(tasks, tuple):
+            data[name], ids[name] = freeze_tasks(tasks)
+
+
+def invalidate_cache():
+    """Forget the in-memory document; the next load re-reads the files."""
+    with _cache_lock:
+        _cache["signature"] = None
+        _cache["data"] = None
+        _cache["ids"] = None
+    if _shard_store is not None:
+        _shard_store.invalidate()
+
+
+def _shards():
+    """The ShardStore of the configured user, migrating todo.json into it
+    the first time it is used."""
+    global _shard_store
+
+    with _shard_store_lock:
+        root = USERS_DIR / settings["user"]
+        if _shard_store is None or _shard_store.root != root:
+            _shard_store = ShardStore(root)
+        store = _shard_store
+
+    if not store.exists():
+        with FileLock(str(DATA_FILE)):
+            if not store.exists():
+                store.import_document(_load_locked(exclusive=True))
+    return store
+
+
+def _load_locked(*, exclusive=False):
+    """
+    Return the cached document, re-reading it if the files changed.
+    The file lock must be held.
+
+    If tasks had to be given IDs, the document is only usable once the
+    IDs are saved, which needs the exclusive lock: under a shared lock
+    None is returned instead.
+    """
+    signature = _signature()
+
+    with _cache_lock:
+        if _cache["data"] is not None and _cache["signature"] == signature:
+            return _cache["data"]
+
+        with stage("todo.load"):
+            data, ids, assigned, snapshot, journal_size = _read_document()
+        if not assigned:
+            _freeze(data, ids)
+            _cache.update(
+                signature=signature,
+                data=data,
+                ids=ids,
+                snapshot=snapshot,
+                journal_size=journal_size,
+            )
+            return data
+
+    if not exclusive:
+        return None
+
+    _write_snapshot(data, ids)
+    return data
+
+
+def _load():
+    """The cached document, loading it if needed (file and journal modes)."""
+    with _cache_lock:
+        if _cache["data"] is not None and _cache["signature"] == _signature():
+            return _cache["data"]
+
+    # Locks are not re-entrant: writers holding the exclusive lock use
+    # _load_locked() directly
+    with FileLock(str(DATA_FILE), shared=True):
+        data = _load_locked()
+    if data is not None:
+        return data
+
+    # Tasks without IDs: save the IDs they were given
+    with FileLock(str(DATA_FILE)):
+        return _load_locked(exclusive=True)
+
+
 def load_data():
-    """Load the JSON data from file. Return empty dict if file doesn't exist."""
-    if not DATA_FILE.exists():
-        return {}
-    with DATA_FILE.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    """
+    Load the JSON data. Return empty mapping if file doesn't exist.
+
+    The result is a read-only view of the document shared by the whole
+    process: change it through apply_ops() (or pass a new dict to
+    save_data()). In sharded mode this reads every shard; prefer
+    list_workspaces() and load_workspace().
+    """
+    if settings["mode"] == "sharded":
+        return MappingProxyType(_shards().load_all()[0])
+    return MappingProxyType(_load())
+
+
+def list_workspaces():
+    """Return the workspace names (sharded mode reads the manifest only)."""
+    if settings["mode"] == "sharded":
+        return _shards().workspaces()
+    return list(load_data())
+
+
+def load_workspace(name):
+    """
+    Return the tasks of a workspace (a read-only tuple) and its task ID
+    map, which must not be changed either.
+    """
+    if settings["mode"] == "sharded":
+        return _shards().load_workspace(name)
+
+    while True:
+        data = _load()
+        with _cache_lock:
+            if _cache["data"] is data:
+                ids = _cache["ids"]
+                break
+        # Reloaded by another thread in between: try again
+
+    if name not in data:
+        raise ValueError("Workspace does not exist")
+    return data[name], ids[name]
+
+
+def find_task(workspace, task_id):
+    """Return the task with `task_id` in `workspace` in constant time."""
+    _, ids = load_workspace(workspace)
+    try:
+        return ids[task_id]
+    except KeyError:
+        raise TaskNotFoundError("Task not found")
+
+
+# -----------------------------
+# Saving
+# -----------------------------
+
+def _write_snapshot(data, ids=None):
+    """Rewrite todo.json and drop the journal. The file lock must be held."""
+    with stage("todo.write"):
+        if ids is None:
+            ids, _ = index_tasks(data)
+        raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+        atomic_write_bytes(DATA_FILE, raw)
+        _freeze(data, ids)
+
+    # The journal belongs to the previous snapshot now
+    journal.remove_journal(JOURNAL_FILE)
+
+    with _cache_lock:
+        _cache.update(
+            signature=_signature(),
+            data=data,
+            ids=ids,
+            snapshot=journal.snapshot_id(raw),
+            journal_size=0,
+        )
+
 
 def save_data(data):
-    """Save JSON data to file safely using a file lock."""
+    """Save JSON data to file safely using an exclusive file lock."""
+    # Cached (frozen) from here on: keep the caller's dict out of it
+    data = {name: [dict(task) for task in tasks] for name, tasks in data.items()}
+
+    if settings["mode"] == "sharded":
+        _shards().import_document(data)
+        return
+
+    lock = FileLock(str(DATA_FILE))
+    try:
+        with lock:
+            _write_snapshot(data)
+    except Exception:
+        # The in-memory document may now differ from the files
+        invalidate_cache()
+        raise
+
+
+def _notify(data, ids, ops, previous):
+    for callback in _listeners:
+        try:
+            callback(data, ids, ops, previous)
+        except Exception as e:
+            # The change is already saved; don't report it as failed
+            print(f"Warning: todo listener failed: {e}")
+
+
+def apply_ops(ops):
+    """
+    Apply a list of operations and persist them, all or nothing.
+
+    The document is re-validated under the file lock, so concurrent
+    writers never overwrite each other's changes. The operations are
+    applied to a copy, published to the cache only once it is saved: if
+    any operation is invalid or the write fails, readers never see it.
+    """
+    if settings["mode"] == "sharded":
+        _shards().apply_ops(ops, on_applied=_notify)
+        return
+
     lock = FileLock(str(DATA_FILE))
+    compact = False
+
     with lock:
-        with DATA_FILE.open("w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        current = _load_locked(exclusive=True)
+        with _cache_lock:
+            previous = _cache["ids"]
+            snapshot = _cache["snapshot"]
+        data, ids = copy_workspaces(current, previous, touched_workspaces(ops))
+        apply_batch(data, ids, ops)
+
+        if settings["mode"] == "journal":
+            with stage("todo.journal_append"):
+                journal.append_transaction(JOURNAL_FILE, snapshot, ops)
+            _freeze(data, ids)
+            with _cache_lock:
+                _cache.update(signature=_signature(), data=data, ids=ids)
+                _cache["journal_size"] += 1
+                compact = _cache["journal_size"] >= settings["compact_threshold"]
+        else:
+            _write_snapshot(data, ids)
+
+        _notify(data, ids, ops, previous)
+
+    if compact:
+        threading.Thread(target=compact_journal, daemon=True).start()
+
+
+def compact_journal():
+    """Fold the journal into a new snapshot (no-op if another compaction runs)."""
+    if not _compact_lock.acquire(blocking=False):
+        return
+
+    try:
+        with FileLock(str(DATA_FILE)):
+            data = _load_locked(exclusive=True)
+            if _cache["journal_size"]:
+                _write_snapshot(data, _cache["ids"])
+    except Exception as e:
+        invalidate_cache()
+        print(f"Warning: journal compaction failed: {e}")
+    finally:
+        _compact_lock.release()
+
 
+def export_data(indent=4):
+    """Return the whole document as pretty-printed JSON text."""
+    return json.dumps(dict(load_data()), indent=indent)
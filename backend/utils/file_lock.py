@@ -1,33 +1,109 @@
 # backend/utils/file_lock.py
 
 """
-Simple file-based lock to avoid concurrent writes.
+File-based reader/writer lock to avoid concurrent writes.
+
+Uses kernel advisory locks on a "<file>.lock" companion file: fcntl.flock
+on POSIX, msvcrt.locking on Windows (where shared locks are exclusive).
+
+- Waiters block in the kernel and wake up as soon as the lock is
+  released, instead of polling.
+- The kernel drops the lock when its owner exits, so a crashed process
+  never leaves a stale lock behind. The mere existence of a lock file
+  (e.g. one left by an older version) means nothing.
+- Every FileLock instance opens its own descriptor, so threads of the
+  same process exclude each other too. Locks are not re-entrant.
 """
 
-import time
 import os
+import time
+
+from backend.utils.metrics import stage
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 
 class FileLock:
-    def __init__(self, filepath, timeout=5, delay=0.1):
+    def __init__(self, filepath, timeout=None, delay=0.1, *, shared=False):
+        """
+        Args:
+            filepath (str): File to protect; the lock lives in filepath + ".lock".
+            timeout (float | None): Seconds to wait before raising TimeoutError.
+                None blocks until the lock is available.
+            delay (float): Longest pause between attempts when a timeout is set.
+            shared (bool): Take a shared (reader) lock instead of an
+                exclusive (writer) one.
+        """
         self.filepath = filepath + ".lock"
         self.timeout = timeout
         self.delay = delay
+        self.shared = shared
+        self.fd = None
 
     def acquire(self):
-        start_time = time.time()
-        while True:
-            try:
-                # Cria o arquivo lock; falha se já existir
-                self.fd = os.open(self.filepath, os.O_CREAT | os.O_EXCL | os.O_RDWR)
-                return
-            except FileExistsError:
-                if (time.time() - start_time) >= self.timeout:
-                    raise TimeoutError(f"Could not acquire lock on {self.filepath}")
-                time.sleep(self.delay)
+        self.fd = os.open(self.filepath, os.O_CREAT | os.O_RDWR)
+        try:
+            # Time spent waiting for other holders (the to-do storage lock)
+            with stage("file_lock.wait"):
+                self._acquire()
+        except BaseException:
+            os.close(self.fd)
+            self.fd = None
+            raise
+
+    def _acquire(self):
+        if self.timeout is None:
+            self._lock(blocking=True)
+            return
+
+        start_time = time.monotonic()
+        pause = 0.001
+        while not self._lock(blocking=False):
+            if (time.monotonic() - start_time) >= self.timeout:
+                raise TimeoutError(f"Could not acquire lock on {self.filepath}")
+            time.sleep(pause)
+            pause = min(pause * 2, self.delay)
 
     def release(self):
-        os.close(self.fd)
-        os.remove(self.filepath)
+        if self.fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self.fd)
+            self.fd = None
+
+    def _lock(self, *, blocking):
+        """Try to take the lock; return False if it is busy (non-blocking only)."""
+        if fcntl is not None:
+            flags = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+            if not blocking:
+                flags |= fcntl.LOCK_NB
+            try:
+                fcntl.flock(self.fd, flags)
+            except BlockingIOError:
+                return False
+            return True
+
+        # msvcrt has no shared locks and its blocking mode gives up after
+        # ~10 seconds, so keep retrying until the lock is ours
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(self.fd, msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(0.01)
 
     def __enter__(self):
         self.acquire()
@@ -35,4 +111,3 @@ class FileLock:
 
     def __exit__(self, exc_type, exc_value, traceback):
         self.release()
-
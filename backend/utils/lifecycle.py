@@ -0,0 +1,15 @@
+# backend/utils/lifecycle.py
+
+"""
+Shutdown flag for long-lived responses.
+
+Event streams (/api/todo/events) wait for changes between messages, so
+a graceful shutdown or restart would wait out its whole timeout for
+them. They check `stopping` instead and end, and the browser reconnects
+to the next server: scripts/run_local.py sets it when a worker is told
+to exit, and /shutdown sets it under the development server.
+"""
+
+import threading
+
+stopping = threading.Event()
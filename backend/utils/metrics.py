@@ -0,0 +1,344 @@
+# backend/utils/metrics.py
+
+"""
+Built-in latency and traffic metrics, served in the Prometheus text
+format at /metrics (no collector or client library needed).
+
+- Requests: track_requests(app) times every request per route, method
+  and status, from the start of the request until its body is sent,
+  and counts bytes in and out and requests in flight.
+- Stages: `with stage("pdf.merge.write"): ...` times one step inside a
+  service. Jobs that run on the process pool record their stages in the
+  worker process; iter_jobs brings them back with the result (see
+  collect_stages).
+- Workers: every process keeps its own numbers. Under the pre-fork
+  server (scripts/run_local.py), each worker also writes them to
+  temp/.metrics every FLUSH_INTERVAL seconds, and /metrics adds up the
+  recent snapshots of all workers.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+import atexit
+import json
+import os
+import threading
+import time
+
+from backend.utils.paths import TEMP_DIR
+
+# Histogram bounds in seconds, shared by requests and stages
+DURATION_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1, 2.5, 5, 10, 30, 60, 120, 300, 900,
+)
+
+# name -> (type, help)
+METRICS = {
+    "workbench_request_duration_seconds": (
+        "histogram", "Time from the start of a request until its response body is sent"),
+    "workbench_stage_duration_seconds": (
+        "histogram", "Time spent in one processing stage"),
+    "workbench_request_bytes_total": ("counter", "Request body bytes received"),
+    "workbench_response_bytes_total": ("counter", "Response body bytes sent"),
+    "workbench_requests_in_flight": ("gauge", "Requests being handled"),
+    "workbench_result_cache_lookups_total": ("counter", "Result cache lookups"),
+}
+
+# Snapshots of the pre-fork workers, and how often they are written
+SHARE_DIR = TEMP_DIR / ".metrics"
+FLUSH_INTERVAL = 5
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (name, labels) -> number, or for histograms a list of the
+        # count per bucket (the last one is +Inf) followed by the sum
+        self._values = {}
+        self.share_dir = None
+        self._flusher = None
+
+    # -----------------------------
+    # Recording
+    # -----------------------------
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        """Add `amount` to a counter or gauge (negative for gauges only)."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Add one observation to a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(DURATION_BUCKETS) + 1) + [0.0]
+            values[bisect_left(DURATION_BUCKETS, seconds)] += 1
+            values[-1] += seconds
+
+    # -----------------------------
+    # Sharing between workers
+    # -----------------------------
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [
+                [name, labels, list(value) if isinstance(value, list) else value]
+                for (name, labels), value in self._values.items()
+            ]
+
+    def share(self, directory: Path) -> None:
+        """Write a snapshot to `directory` now and every FLUSH_INTERVAL seconds."""
+        self.share_dir = Path(directory)
+        self.share_dir.mkdir(parents=True, exist_ok=True)
+        self.flush()
+
+        if self._flusher is not None:
+            return
+
+        # A worker that exits normally takes its counts with it right away
+        atexit.register(self._snapshot_path().unlink, missing_ok=True)
+
+        def run():
+            while True:
+                time.sleep(FLUSH_INTERVAL)
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Warning: could not write metrics: {e}")
+
+        self._flusher = threading.Thread(target=run, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def flush(self) -> None:
+        if self.share_dir is None:
+            return
+        # Renamed into place so readers never see half a file (no fsync:
+        # losing a snapshot in a crash only loses counts)
+        path = self._snapshot_path()
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(json.dumps(self.snapshot(), separators=(",", ":")).encode())
+        os.replace(tmp, path)
+
+    def _snapshot_path(self) -> Path:
+        return self.share_dir / f"{os.getpid()}.json"
+
+    def _shared_snapshots(self) -> list[list]:
+        """Recent snapshots of the other workers; stale ones are removed."""
+        snapshots = []
+        now = time.time()
+
+        for path in self.share_dir.glob("*.json"):
+            if path.stem == str(os.getpid()):
+                continue
+            try:
+                if now - path.stat().st_mtime > 3 * FLUSH_INTERVAL:
+                    # Its worker stopped (or restarted under a new pid)
+                    path.unlink(missing_ok=True)
+                    continue
+                snapshots.append(json.loads(path.read_bytes()))
+            except (OSError, ValueError):
+                continue  # removed or being replaced: skip this scrape
+
+        return snapshots
+
+    # -----------------------------
+    # Exposition
+    # -----------------------------
+
+    def render(self, gauges: dict | None = None) -> str:
+        """
+        Return every metric in the Prometheus text format.
+
+        Args:
+            gauges (dict): Extra point-in-time values, {name: (help, value)},
+                which are the same for every worker (e.g. disk usage).
+        """
+        totals = {}
+        snapshots = [self.snapshot()]
+        if self.share_dir is not None:
+            snapshots += self._shared_snapshots()
+
+        for snapshot in snapshots:
+            for name, labels, value in snapshot:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                if key not in totals:
+                    totals[key] = value
+                elif isinstance(value, list):
+                    totals[key] = [a + b for a, b in zip(totals[key], value)]
+                else:
+                    totals[key] += value
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            series = sorted((labels, value) for (n, labels), value in totals.items() if n == name)
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+            for labels, value in series:
+                if kind != "histogram":
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS + ("+Inf",), value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+        for name, (help_text, value) in (gauges or {}).items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge",
+                      f"{name} {_number(value)}"]
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Shared instance
+metrics = Metrics()
+
+
+# -----------------------------
+# Stages
+# -----------------------------
+
+_capture = threading.local()
+
+
+def record_stage(name: str, seconds: float) -> None:
+    stages = getattr(_capture, "stages", None)
+    if stages is not None:
+        stages.append((name, seconds))
+    else:
+        metrics.observe("workbench_stage_duration_seconds", seconds, stage=name)
+
+
+def record_stages(stages) -> None:
+    """Record stages returned by collect_stages (e.g. from a worker process)."""
+    for name, seconds in stages:
+        record_stage(name, seconds)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as processing stage `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+@contextmanager
+def collect_stages():
+    """
+    Keep the stages timed in this thread in a list instead of recording
+    them, so a pool worker can return them with its result.
+    """
+    _capture.stages = stages = []
+    try:
+        yield stages
+    finally:
+        _capture.stages = None
+
+
+# -----------------------------
+# Requests
+# -----------------------------
+
+def _counted(body, route: str):
+    """Pass a streamed body through, counting the bytes sent."""
+    sent = 0
+    try:
+        for chunk in body:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        close = getattr(body, "close", None)
+        if close is not None:
+            close()
+        metrics.inc("workbench_response_bytes_total", sent, route=route)
+
+
+def track_requests(app) -> None:
+    """Time and count every request of `app` (see the module docstring)."""
+    # Imported here: pool workers import this module for stage() only
+    from flask import g, request
+
+    @app.before_request
+    def _start_request():
+        g.metrics_start = time.perf_counter()
+        g.metrics_route = route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.inc("workbench_requests_in_flight", route=route)
+        metrics.inc("workbench_request_bytes_total", request.content_length or 0, route=route)
+
+    @app.after_request
+    def _finish_request(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response  # before_request did not run (e.g. it failed earlier)
+
+        route = g.pop("metrics_route")
+        method = request.method
+        handled = time.perf_counter()
+
+        if response.is_streamed and not response.direct_passthrough:
+            response.response = _counted(response.response, route)
+        else:
+            # Known up front, including files from send_file
+            metrics.inc("workbench_response_bytes_total", response.content_length or 0, route=route)
+
+        pending = [True]
+
+        def done():
+            # The body has been sent (or the client went away)
+            if not pending:
+                return
+            pending.clear()
+            finished = time.perf_counter()
+            record_stage("response.send", finished - handled)
+            metrics.observe("workbench_request_duration_seconds", finished - start,
+                            route=route, method=method, status=str(response.status_code))
+            metrics.inc("workbench_requests_in_flight", -1, route=route)
+
+        if response.direct_passthrough:
+            # Files from send_file go to the server as they are (it may use
+            # sendfile) and only the file wrapper gets closed: hook that
+            _close_with(response.response, done)
+        else:
+            response.call_on_close(done)
+        return response
+
+
+def _close_with(body, callback) -> None:
+    """Call `callback` after body.close(), or now if that can't be hooked."""
+    close = getattr(body, "close", None)
+
+    def closing():
+        try:
+            if close is not None:
+                close()
+        finally:
+            callback()
+
+    try:
+        body.close = closing
+    except AttributeError:
+        callback()
@@ -0,0 +1,15 @@
+# backend/utils/paths.py
+
+"""
+Centralized path resolution for runtime directories.
+"""
+
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+DATA_DIR = PROJECT_ROOT / "data"
+TEMP_DIR = PROJECT_ROOT / "temp"
+
+# Cached results of image/PDF operations (safe to delete at any time)
+CACHE_DIR = PROJECT_ROOT / "cache"
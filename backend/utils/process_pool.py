@@ -0,0 +1,135 @@
+# backend/utils/process_pool.py
+
+"""
+Shared process pool for CPU-bound jobs.
+
+The pool is created on first use and reused by every request of the
+process. Jobs are plain keyword-argument dicts passed to a module-level
+function, so they can be pickled to the worker processes.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import itertools
+import multiprocessing
+import threading
+
+from backend.utils.metrics import collect_stages, record_stages
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor | None:
+    """
+    Return the shared pool sized for `workers` processes.
+
+    Returns None when `workers` is 0 or 1, meaning jobs should run inline.
+    """
+    global _pool, _pool_workers
+
+    if workers <= 1:
+        return None
+
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # "spawn" behaves the same on every platform and avoids forking
+            # a multi-threaded server process
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def _run_measured(func, job):
+    """Run func(**job) in a worker and return the stages it timed with its result."""
+    with collect_stages() as stages:
+        result = func(**job)
+    return result, stages
+
+
+def _result(future, return_exceptions: bool):
+    try:
+        result, stages = future.result()
+    except BrokenProcessPool:
+        raise
+    except Exception as e:
+        if not return_exceptions:
+            raise
+        return e
+    record_stages(stages)
+    return result
+
+
+def iter_jobs(func, jobs, *, workers: int, max_pending: int | None = None,
+              return_exceptions: bool = False):
+    """
+    Run func(**job) for every job and yield the results in job order.
+
+    `jobs` may be any iterable of job dicts. It is consumed lazily: at
+    most `max_pending` jobs (default: two per worker) are submitted ahead
+    of the result being yielded, so large inputs are never all held in
+    memory at once.
+
+    With more than one job and `workers` > 1, jobs run in parallel on the
+    shared pool. Either way, the first failing job (in order) raises its
+    own exception, exactly as a sequential loop would, and the stages the
+    jobs time (see metrics.stage) are recorded in this process.
+
+    With `return_exceptions`, a failing job's exception is yielded as its
+    result instead and the other jobs go on. A broken pool (a worker
+    died) still raises BrokenProcessPool.
+    """
+    jobs = iter(jobs)
+    head = list(itertools.islice(jobs, 2))
+    pool = get_pool(workers) if len(head) > 1 else None
+    jobs = itertools.chain(head, jobs)
+
+    if pool is None:
+        for job in jobs:
+            try:
+                result = func(**job)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                result = e
+            yield result
+        return
+
+    max_pending = max_pending or 2 * workers
+    futures = deque()
+
+    try:
+        for job in jobs:
+            futures.append(pool.submit(_run_measured, func, job))
+            if len(futures) >= max_pending:
+                yield _result(futures.popleft(), return_exceptions)
+        while futures:
+            yield _result(futures.popleft(), return_exceptions)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed by the OS): start fresh next time
+        _reset_pool()
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def run_jobs(func, jobs: list[dict], *, workers: int) -> list:
+    """Run all jobs (see iter_jobs) and return their results as a list."""
+    return list(iter_jobs(func, jobs, workers=workers))
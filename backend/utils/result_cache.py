@@ -0,0 +1,196 @@
+# backend/utils/result_cache.py
+
+"""
+Content-addressed on-disk cache for results of file operations.
+
+A result is keyed by a hash of the input file bytes plus the operation
+name and its parameters, so re-running the same preset, filter set or
+compress quality on the same file is served straight from disk.
+
+The cache directory is bounded in size and evicts the least recently
+used entries first (entries are touched on every hit).
+"""
+
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+
+from backend.utils.metrics import metrics
+from backend.utils.paths import CACHE_DIR
+
+# Bump when an operation's output changes for the same parameters,
+# so stale results are never served after an upgrade
+CACHE_VERSION = 2
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ResultCache:
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    # -----------------------------
+    # Keys
+    # -----------------------------
+
+    def make_key(self, input_path: Path, operation: str, params: dict) -> str:
+        """Hash the input file contents together with the operation parameters."""
+        digest = hashlib.sha256()
+        header = {"v": CACHE_VERSION, "op": operation, "params": params}
+        digest.update(json.dumps(header, sort_keys=True, default=str).encode())
+
+        with open(input_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def job_key(self, operation: str, job: dict) -> str:
+        """
+        Key for a job dict holding input_path, output_path and parameters.
+
+        The output suffix is part of the key because it selects the
+        output format.
+        """
+        params = {
+            name: value
+            for name, value in job.items()
+            if name not in ("input_path", "output_path")
+        }
+        params["output_suffix"] = Path(job["output_path"]).suffix.lower()
+        return self.make_key(job["input_path"], operation, params)
+
+    # -----------------------------
+    # Lookup / store
+    # -----------------------------
+
+    def fetch(self, key: str, output_path: Path) -> bool:
+        """
+        Place the cached result for `key` at `output_path`.
+
+        Returns False (a miss) when there is no such entry.
+        """
+        if not self.enabled:
+            return False
+
+        entry = self.root / key
+        try:
+            _link_or_copy(entry, Path(output_path))
+            # Mark as recently used for LRU eviction
+            os.utime(entry)
+        except OSError:
+            self._count(hit=False)
+            return False
+
+        self._count(hit=True)
+        return True
+
+    def store(self, key: str, output_path: Path) -> None:
+        """Add a freshly produced result to the cache, then enforce the size bound."""
+        if not self.enabled:
+            return
+
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.root / f".{key}.{uuid.uuid4().hex}.tmp"
+            _link_or_copy(Path(output_path), tmp)
+            os.replace(tmp, self.root / key)
+        except OSError as e:
+            # A cache write failure must never fail the request
+            print(f"Warning: could not cache result: {e}")
+            return
+
+        self._evict()
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    # -----------------------------
+    # Internals
+    # -----------------------------
+
+    def _count(self, *, hit: bool) -> None:
+        metrics.inc("workbench_result_cache_lookups_total", result="hit" if hit else "miss")
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        """Return (last_used, size, path) for every cache entry."""
+        entries = []
+        try:
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if entry.name.startswith(".") or not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, Path(entry.path)))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    """Hard-link src to dst (no data copied), falling back to a real copy."""
+    try:
+        os.link(src, dst)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+# Shared instance, sized from app config at startup (CACHE_MAX_BYTES)
+result_cache = ResultCache(CACHE_DIR)
+
+
+def cached_call(operation: str, func, **job) -> None:
+    """
+    Run func(**job) unless a cached result for the same input and
+    parameters exists. `job` must contain input_path and output_path.
+    """
+    if not result_cache.enabled:
+        func(**job)
+        return
+
+    key = result_cache.job_key(operation, job)
+    if result_cache.fetch(key, job["output_path"]):
+        return
+
+    func(**job)
+    result_cache.store(key, job["output_path"])
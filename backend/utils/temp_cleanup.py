@@ -19,3 +19,20 @@ def cleanup_temp_dir(path: Path) -> None:
         # Intentionally silent: cleanup failure should not
         # break the main application flow
         pass
+
+
+def cleanup_when_closed(response, path: Path, *, remove=cleanup_temp_dir):
+    """
+    Remove a temporary working directory once the response is fully sent.
+
+    Use this instead of cleaning up directly in after_this_request when
+    the response may be streamed: its body is still being read from
+    `path` after the view has returned. Other responses (including
+    send_file, which already holds its file open) are cleaned up now.
+    `remove` is called to do the removal.
+    """
+    if response.is_streamed and not response.direct_passthrough:
+        response.call_on_close(lambda: remove(path))
+    else:
+        remove(path)
+    return response
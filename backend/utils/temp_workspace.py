@@ -0,0 +1,276 @@
+# backend/utils/temp_workspace.py
+
+"""
+Shared manager for per-request work directories (temp/<tool>_<pid>_<id>).
+
+- Cleanup: request_workspace() creates a directory and registers its
+  removal for when the response is done (streamed or not), so no route
+  can forget an error path.
+- Sweeping: directories left behind by a crash or a killed worker are
+  removed at startup and then periodically. A directory is orphaned
+  when the process in its name is gone, when it belongs to this process
+  but no request is using it, or when it is older than TEMP_MAX_AGE.
+- Quota: a new workspace is only handed out while temp/ holds less than
+  TEMP_QUOTA_BYTES plus the incoming request body. Otherwise the request
+  waits for other requests to finish, up to TEMP_QUOTA_WAIT seconds,
+  then gets a 503. Usage is measured on disk, so every worker process
+  sees the same total.
+- RAM: with TEMP_RAM_DIR set (e.g. /dev/shm/workbench), small jobs of
+  tools that ask for it (image work) get their workspace on tmpfs, as
+  long as it stays under TEMP_RAM_QUOTA_BYTES.
+"""
+
+from pathlib import Path
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+from flask import after_this_request, request
+
+from backend.utils.paths import TEMP_DIR
+from backend.utils.temp_cleanup import cleanup_temp_dir, cleanup_when_closed
+
+# <tool>_<pid>_<hex>; older versions used <tool>_<hex>
+WORKSPACE_RE = re.compile(r"^(?P<tool>[a-z_]+?)(?:_(?P<pid>\d+))?_(?P<id>[0-9a-f]{32})$")
+
+# A directory this process is not using is only swept after this many
+# seconds, so a workspace being created is never taken for an orphan
+SWEEP_GRACE = 60
+
+# How long a usage measurement is reused, and how often waiting
+# requests check for room again
+USAGE_TTL = 1.0
+QUOTA_POLL = 0.5
+
+
+class TempQuotaExceeded(RuntimeError):
+    """No room in the temp directory quota, even after waiting."""
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        total += _dir_size(Path(entry.path))
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue  # removed while scanning
+    except OSError:
+        pass
+    return total
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill would terminate the process: rely on age instead
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class TempWorkspaces:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.quota_bytes = 0
+        self.quota_wait = 30
+        self.max_age = 24 * 3600
+        self.ram_root = None
+        self.ram_job_bytes = 0
+        self.ram_quota_bytes = 0
+
+        self._lock = threading.Lock()
+        self._active = set()  # workspaces of this process still in use
+        self._usage = {}  # root -> (measured at, bytes)
+        self._sweeper = None
+
+    def configure(self, *, quota_bytes=0, quota_wait=30, max_age=24 * 3600,
+                  ram_dir="", ram_job_bytes=0, ram_quota_bytes=0):
+        self.quota_bytes = quota_bytes
+        self.quota_wait = quota_wait
+        self.max_age = max_age
+        self.ram_root = None
+        self.ram_job_bytes = ram_job_bytes
+        self.ram_quota_bytes = ram_quota_bytes
+
+        if ram_dir:
+            try:
+                Path(ram_dir).mkdir(parents=True, exist_ok=True)
+                self.ram_root = Path(ram_dir)
+            except OSError as e:
+                print(f"Warning: RAM temp directory unavailable, using disk: {e}")
+
+    def roots(self) -> list[Path]:
+        return [self.root] + ([self.ram_root] if self.ram_root else [])
+
+    # -----------------------------
+    # Usage
+    # -----------------------------
+
+    def usage(self, root: Path | None = None, *, fresh: bool = False) -> int:
+        """Bytes used by the workspaces under `root` (default: temp/)."""
+        root = root or self.root
+        now = time.monotonic()
+        with self._lock:
+            measured = self._usage.get(root)
+            if measured and not fresh and now - measured[0] < USAGE_TTL:
+                return measured[1]
+
+        size = _dir_size(root)
+        with self._lock:
+            self._usage[root] = (now, size)
+        return size
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._active),
+            "bytes": self.usage(),
+            "quota_bytes": self.quota_bytes,
+            "ram_bytes": self.usage(self.ram_root) if self.ram_root else 0,
+        }
+
+    def _pick_root(self, expected_bytes: int, prefer_ram: bool) -> Path:
+        if prefer_ram and self.ram_root is not None and expected_bytes <= self.ram_job_bytes:
+            if self.usage(self.ram_root) + expected_bytes <= self.ram_quota_bytes:
+                return self.ram_root
+        return self.root
+
+    def _wait_for_room(self, expected_bytes: int) -> None:
+        """Back-pressure: wait until the quota has room for `expected_bytes`."""
+        if not self.quota_bytes:
+            return
+
+        deadline = time.monotonic() + self.quota_wait
+        fresh = False
+        while self.usage(fresh=fresh) + expected_bytes > self.quota_bytes:
+            if expected_bytes > self.quota_bytes or time.monotonic() >= deadline:
+                raise TempQuotaExceeded("Server is busy (temporary storage full), try again shortly")
+            time.sleep(QUOTA_POLL)
+            fresh = True
+
+    # -----------------------------
+    # Workspaces
+    # -----------------------------
+
+    def create(self, tool: str, *, expected_bytes: int = 0, prefer_ram: bool = False) -> Path:
+        """
+        Create a work directory for `tool`, waiting for quota room first.
+
+        Raises:
+            TempQuotaExceeded: If there was no room within quota_wait seconds.
+        """
+        root = self._pick_root(expected_bytes, prefer_ram)
+        if root == self.root:
+            self._wait_for_room(expected_bytes)
+
+        path = root / f"{tool}_{os.getpid()}_{uuid.uuid4().hex}"
+        path.mkdir(parents=True, exist_ok=False)
+        with self._lock:
+            self._active.add(path)
+        return path
+
+    def release(self, path: Path) -> None:
+        """Remove a work directory now."""
+        cleanup_temp_dir(Path(path))
+        with self._lock:
+            self._active.discard(Path(path))
+
+    # -----------------------------
+    # Sweeping
+    # -----------------------------
+
+    def _is_orphan(self, path: Path, now: float) -> bool:
+        match = WORKSPACE_RE.match(path.name)
+        if match is None:
+            return False  # not a workspace (e.g. .gitkeep)
+
+        try:
+            age = now - path.stat().st_mtime
+        except OSError:
+            return False
+        if age > self.max_age:
+            return True
+
+        pid = match.group("pid")
+        if pid is None:
+            # Older naming: no owner to check, the age decides
+            return False
+        if int(pid) != os.getpid():
+            return not _pid_alive(int(pid))
+
+        with self._lock:
+            in_use = path in self._active
+        return not in_use and age > SWEEP_GRACE
+
+    def sweep(self) -> int:
+        """Remove orphaned work directories; return how many were removed."""
+        now = time.time()
+        removed = 0
+
+        for root in self.roots():
+            try:
+                entries = [Path(e.path) for e in os.scandir(root) if e.is_dir(follow_symlinks=False)]
+            except OSError:
+                continue
+            for path in entries:
+                if self._is_orphan(path, now):
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+
+        with self._lock:
+            self._active = {p for p in self._active if p.exists()}
+            self._usage.clear()
+        return removed
+
+    def start_sweeper(self, interval: int) -> None:
+        """Sweep now, then every `interval` seconds in a background thread."""
+        removed = self.sweep()
+        if removed:
+            print(f"Removed {removed} orphaned temp directories")
+
+        if interval <= 0 or self._sweeper is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Warning: temp sweep failed: {e}")
+
+        self._sweeper = threading.Thread(target=run, name="temp-sweeper", daemon=True)
+        self._sweeper.start()
+
+
+# Shared instance, configured from app config at startup (TEMP_*)
+temp_workspaces = TempWorkspaces(TEMP_DIR)
+
+
+def request_workspace(tool: str, *, prefer_ram: bool = False) -> Path:
+    """
+    Create a work directory for the current request, sized against the
+    quota by the request body, and remove it once the response is done.
+    """
+    path = temp_workspaces.create(
+        tool,
+        expected_bytes=request.content_length or 0,
+        prefer_ram=prefer_ram,
+    )
+
+    @after_this_request
+    def cleanup(response):
+        return cleanup_when_closed(response, path, remove=temp_workspaces.release)
+
+    return path
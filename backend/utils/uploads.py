@@ -0,0 +1,77 @@
+# backend/utils/uploads.py
+
+"""
+Upload spooling straight into request work directories.
+
+By default Werkzeug buffers every uploaded file in memory or in an
+anonymous temporary file, and FileStorage.save() then copies it to its
+final place: every byte is written to disk twice. With UploadRequest
+(set as the app's request_class), a view that calls spool_uploads()
+before touching request.files gets each file part written directly into
+its work directory, and save_upload() only renames it into place.
+
+spool_uploads() also applies the tool's upload limit (UPLOAD_LIMITS in
+app/config.py): a larger request is refused with 413 before it is read.
+"""
+
+from pathlib import Path
+import shutil
+import tempfile
+
+from flask import Request, current_app, request
+
+from backend.utils.metrics import stage
+
+
+class UploadRequest(Request):
+    # Directory the file parts of this request are written to (see spool_uploads)
+    upload_dir: Path | None = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        if self.upload_dir is None:
+            return super()._get_file_stream(
+                total_content_length, content_type, filename, content_length
+            )
+
+        # Named, so save_upload can move it instead of copying it
+        return tempfile.NamedTemporaryFile(
+            dir=self.upload_dir, prefix=".upload_", delete=False
+        )
+
+
+def spool_uploads(work_dir: Path, tool: str) -> None:
+    """
+    Apply the upload limit of `tool` and read this request's uploaded
+    files into `work_dir`. Must be called before request.files is used.
+    """
+    if isinstance(request._get_current_object(), UploadRequest):
+        request.upload_dir = Path(work_dir)
+
+    limit = current_app.config.get("UPLOAD_LIMITS", {}).get(tool)
+    if limit:
+        app_limit = current_app.config.get("MAX_CONTENT_LENGTH")
+        request.max_content_length = min(limit, app_limit) if app_limit else limit
+
+    # Parse the body now, so receiving the upload is timed on its own
+    with stage("upload.receive"):
+        request.files
+
+
+def save_upload(file, path: Path) -> Path:
+    """
+    Put an uploaded file at `path`: a rename when it was spooled by
+    spool_uploads(), otherwise a regular FileStorage.save().
+    """
+    upload_dir = getattr(request, "upload_dir", None)
+    spooled = getattr(file.stream, "name", None)
+
+    with stage("upload.save"):
+        if upload_dir is not None and isinstance(spooled, str) and Path(spooled).parent == upload_dir:
+            file.stream.close()
+            # A rename on the same file system, a copy otherwise
+            shutil.move(spooled, path)
+        else:
+            file.save(path)
+
+    return Path(path)
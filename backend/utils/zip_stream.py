@@ -0,0 +1,177 @@
+# backend/utils/zip_stream.py
+
+"""
+Streaming ZIP responses.
+
+The archive is written straight into the HTTP response while the entries
+are still being produced, so the client receives the first bytes as soon
+as the first file is ready and no complete ZIP ever exists on disk.
+
+Once streaming has started, the status can no longer turn into an error.
+Producers report a file they could not make by yielding a FailedEntry
+with the name the user knows it by; it is listed in an ERROR_ENTRY file
+added to the archive and the next entries go on. If the producer itself
+breaks, the archive is still finished properly and ERROR_ENTRY says
+the remaining files were skipped.
+"""
+
+from itertools import chain
+from pathlib import Path
+import time
+import zipfile
+
+from flask import Response
+
+from backend.utils.metrics import record_stage
+
+# Formats that are already compressed: deflating them again costs CPU
+# and saves (almost) nothing, so they are stored as-is
+STORED_SUFFIXES = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp",
+    ".pdf", ".zip", ".mp4", ".mp3",
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+# Lists the files that could not be added, if any
+ERROR_ENTRY = "ERRORS.txt"
+
+
+class FailedEntry:
+    """A file that could not be produced, listed in ERROR_ENTRY instead."""
+
+    def __init__(self, name: str, error: str):
+        self.name = name
+        self.error = error
+
+
+def _describe(error) -> str:
+    """Error text for the archive: OS errors name server paths, leave them out."""
+    if isinstance(error, OSError):
+        return error.strerror or type(error).__name__
+    return str(error)
+
+
+class _Sink:
+    """Write-only buffer handed to ZipFile and drained after every chunk."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(paths, *, remove: bool = True):
+    """
+    Yield a ZIP archive of `paths` chunk by chunk.
+
+    `paths` may be a lazy iterable: every entry is emitted as soon as it
+    is produced. With `remove`, each file is deleted once it is in the
+    archive, so finished outputs do not pile up on disk. FailedEntry
+    items and files that can't be read are listed in ERROR_ENTRY; if
+    `paths` raises, the files it did not produce are noted as skipped.
+    """
+    sink = _Sink()
+    paths = iter(paths)
+    errors = []
+    # Time spent zipping, without waiting for entries or for the client
+    busy = 0.0
+
+    # ZipFile notices the sink cannot seek and writes data descriptors
+    with zipfile.ZipFile(sink, "w") as zipf:
+        while True:
+            try:
+                path = next(paths, None)
+            except Exception as e:
+                # The producer broke (e.g. the process pool died) and a
+                # failed generator is exhausted: nothing more will come
+                print(f"Warning: ZIP entries stopped: {e}")
+                errors.append(f"Remaining files were skipped: {_describe(e)}")
+                break
+
+            if path is None:
+                break
+            if isinstance(path, FailedEntry):
+                errors.append(f"{path.name}: {path.error}")
+                continue
+
+            try:
+                started = time.perf_counter()
+                path = Path(path)
+                info = zipfile.ZipInfo.from_file(path, arcname=path.name)
+                info.compress_type = (
+                    zipfile.ZIP_STORED
+                    if path.suffix.lower() in STORED_SUFFIXES
+                    else zipfile.ZIP_DEFLATED
+                )
+
+                with open(path, "rb") as src, zipf.open(info, "w") as dst:
+                    while chunk := src.read(CHUNK_SIZE):
+                        dst.write(chunk)
+                        data = sink.drain()
+                        busy += time.perf_counter() - started
+                        yield data
+                        started = time.perf_counter()
+
+                if remove:
+                    path.unlink(missing_ok=True)
+
+                data = sink.drain()
+                busy += time.perf_counter() - started
+                yield data
+            except Exception as e:
+                # The response has started: note the failure in the archive
+                print(f"Warning: could not add {path} to the ZIP: {e}")
+                errors.append(f"{Path(path).name}: {_describe(e)}")
+
+        started = time.perf_counter()
+        if errors:
+            report = "Some files could not be added:\n" + "\n".join(errors) + "\n"
+            zipf.writestr(ERROR_ENTRY, report)
+
+    # Central directory
+    data = sink.drain()
+    record_stage("zip.build", busy + time.perf_counter() - started)
+    yield data
+
+
+def zip_response(paths, download_name: str) -> Response:
+    """
+    Build a streamed ZIP download of `paths`.
+
+    Entries are produced until the first file is ready before the
+    response is returned, so errors raised by the producer up to there,
+    or every entry failing (e.g. invalid parameters), still surface as a
+    regular error in the view. Later failures end up in the archive's
+    ERROR_ENTRY (see iter_zip).
+
+    Raises:
+        ValueError: If every entry is a FailedEntry (with its error).
+    """
+    paths = iter(paths)
+    failed = []
+    for first in paths:
+        if not isinstance(first, FailedEntry):
+            paths = chain(failed, [first], paths)
+            break
+        failed.append(first)
+    else:
+        if failed:
+            raise ValueError(failed[0].error)
+
+    response = Response(
+        iter_zip(paths),
+        mimetype="application/zip",
+    )
+    response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    return response
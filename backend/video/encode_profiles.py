@@ -0,0 +1,50 @@
+from pathlib import Path
+import os
+
+
+# -----------------------------
+# Encode profiles
+# -----------------------------
+# Each profile maps to an x264 preset, a constant rate factor (lower is
+# better quality, bigger file) and an AAC audio bitrate.
+
+ENCODE_PROFILES = {
+    "fast": {"preset": "veryfast", "crf": 23, "audio_bitrate": "128k"},
+    "balanced": {"preset": "medium", "crf": 21, "audio_bitrate": "160k"},
+    "small": {"preset": "slow", "crf": 28, "audio_bitrate": "96k"},
+}
+
+DEFAULT_PROFILE = "balanced"
+
+
+def get_profile(name: str | None) -> dict:
+    """Return the settings of a profile (the default one when name is empty)."""
+    name = name or DEFAULT_PROFILE
+    if name not in ENCODE_PROFILES:
+        raise ValueError(f"Invalid encode profile: {name}")
+    return ENCODE_PROFILES[name]
+
+
+def write_videofile_options(
+    output_path: Path,
+    *,
+    profile: str | None = None,
+    threads: int | None = None,
+) -> dict:
+    """
+    Keyword arguments for moviepy's write_videofile.
+
+    `threads` defaults to every core. The temporary audio file moviepy
+    writes is kept next to the output instead of the current directory.
+    """
+    settings = get_profile(profile)
+
+    return {
+        "codec": "libx264",
+        "audio_codec": "aac",
+        "preset": settings["preset"],
+        "ffmpeg_params": ["-crf", str(settings["crf"])],
+        "audio_bitrate": settings["audio_bitrate"],
+        "threads": threads or os.cpu_count() or 1,
+        "temp_audiofile": str(output_path.with_name(f"{output_path.stem}_audio.m4a")),
+    }
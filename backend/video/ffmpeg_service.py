@@ -0,0 +1,227 @@
+from pathlib import Path
+import re
+import subprocess
+
+from backend.utils.metrics import stage
+
+
+# -----------------------------
+# ffmpeg binary
+# -----------------------------
+
+def ffmpeg_binary() -> str:
+    """
+    Return the ffmpeg executable moviepy uses (bundled via imageio-ffmpeg
+    unless FFMPEG_BINARY is set), so both code paths behave the same.
+    """
+    from moviepy.config import get_setting
+
+    return get_setting("FFMPEG_BINARY")
+
+
+def run_ffmpeg(args: list[str]) -> None:
+    """Run ffmpeg with the given arguments, raising RuntimeError on failure."""
+    cmd = [ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y", *args]
+    # Only used for stream copies: nothing is decoded
+    with stage("video.stream_copy"):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+
+
+# -----------------------------
+# Probe
+# -----------------------------
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_STREAM_RE = re.compile(r"Stream #\d+:\d+\S*: (Video|Audio): (.*)")
+# Older ffmpeg prints the "rotate" tag (clockwise), newer ones the display
+# matrix (counter-clockwise): "rotate: 90" is "rotation of -90.00 degrees"
+_ROTATE_TAG_RE = re.compile(r"rotate\s*:\s*(-?[\d.]+)")
+_DISPLAY_MATRIX_RE = re.compile(r"rotation of (-?[\d.]+)")
+
+
+def _split_fields(description: str) -> list[str]:
+    """Split an ffmpeg stream description on commas outside parentheses."""
+    fields = []
+    depth = 0
+    current = ""
+
+    for char in description:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            fields.append(current.strip())
+            current = ""
+            continue
+        current += char
+
+    fields.append(current.strip())
+    return fields
+
+
+def probe_video(path: Path) -> dict:
+    """
+    Describe the streams of a media file using the ffmpeg banner.
+
+    Returns a dict with:
+        duration (float | None): Duration in seconds.
+        video (list[tuple]): One signature per video stream.
+        audio (list[tuple]): One signature per audio stream.
+
+    Signatures hold the codec parameters that must match for two files
+    to be joined without re-encoding.
+    """
+    # ffmpeg exits with an error when no output is given; the banner
+    # on stderr is all we need
+    with stage("video.probe"):
+        result = subprocess.run(
+            [ffmpeg_binary(), "-hide_banner", "-i", str(path)],
+            capture_output=True,
+            text=True,
+        )
+
+    info = {"duration": None, "video": [], "audio": []}
+    current = None
+
+    for line in result.stderr.splitlines():
+        duration = _DURATION_RE.search(line)
+        if duration:
+            hours, minutes, seconds = duration.groups()
+            info["duration"] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+            continue
+
+        stream = _STREAM_RE.search(line)
+        if stream:
+            kind, description = stream.groups()
+            fields = _split_fields(description)
+
+            if kind == "Video":
+                # codec/profile, pixel format, size, frame rate
+                size = next((f.split()[0] for f in fields if re.match(r"\d+x\d+", f)), None)
+                fps = next((f for f in fields if f.endswith(" fps")), None)
+                pix_fmt = fields[1].split("(")[0] if len(fields) > 1 else None
+                current = [fields[0], pix_fmt, size, fps, 0.0]
+                info["video"].append(current)
+            else:
+                # codec/profile, sample rate, channel layout, sample format
+                current = None
+                info["audio"].append(tuple(fields[:4]))
+            continue
+
+        if current is None:
+            continue
+        # Clockwise degrees in [0, 360): 90 and 270 turn opposite ways
+        tag = _ROTATE_TAG_RE.search(line)
+        if tag:
+            current[4] = float(tag.group(1)) % 360
+        matrix = _DISPLAY_MATRIX_RE.search(line)
+        if matrix:
+            current[4] = -float(matrix.group(1)) % 360
+
+    info["video"] = [tuple(signature) for signature in info["video"]]
+
+    if not info["video"]:
+        raise ValueError(f"No video stream found in {Path(path).name}")
+
+    return info
+
+
+def streams_compatible(probes: list[dict]) -> bool:
+    """
+    Check whether files can be concatenated by copying their streams:
+    same number of streams and identical codec parameters everywhere.
+    """
+    first = probes[0]
+    return all(
+        probe["video"] == first["video"] and probe["audio"] == first["audio"]
+        for probe in probes[1:]
+    )
+
+
+# -----------------------------
+# Concatenate (stream copy)
+# -----------------------------
+
+def write_concat_list(input_paths: list[Path], list_path: Path) -> Path:
+    """Write an ffmpeg concat demuxer list for the given files."""
+    lines = []
+    for path in input_paths:
+        escaped = str(Path(path).resolve()).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+
+    list_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return list_path
+
+
+def concat_copy(input_paths: list[Path], output_path: Path) -> None:
+    """
+    Join files with the concat demuxer, copying streams as-is.
+
+    Only valid for files whose streams_compatible() check passed; this
+    is pure container-level I/O, no decoding or encoding happens.
+    """
+    list_path = write_concat_list(
+        input_paths, output_path.with_name(f"{output_path.stem}_concat.txt")
+    )
+
+    try:
+        run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", str(list_path),
+            "-c", "copy",
+            "-movflags", "+faststart",
+            str(output_path),
+        ])
+    finally:
+        list_path.unlink(missing_ok=True)
+
+
+# -----------------------------
+# Replace audio (video stream copy)
+# -----------------------------
+
+def mux_music_copy(
+    video_paths: list[Path],
+    music_path: Path,
+    output_path: Path,
+    *,
+    duration: float,
+    music_start: int = 0,
+    volume: float = 1.0,
+    audio_bitrate: str = "160k",
+) -> None:
+    """
+    Join the videos (if more than one) and replace their audio with the
+    music track in a single ffmpeg run.
+
+    The video stream is copied untouched; only the music is encoded.
+    Several videos must have passed streams_compatible().
+    """
+    list_path = None
+
+    if len(video_paths) > 1:
+        list_path = write_concat_list(
+            video_paths, output_path.with_name(f"{output_path.stem}_concat.txt")
+        )
+        video_input = ["-f", "concat", "-safe", "0", "-i", str(list_path)]
+    else:
+        video_input = ["-i", str(video_paths[0])]
+
+    try:
+        run_ffmpeg([
+            *video_input,
+            # Same window moviepy's subclip(music_start, music_start + duration) takes
+            "-ss", str(music_start), "-t", f"{duration:.3f}", "-i", str(music_path),
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-c:v", "copy",
+            "-af", f"volume={volume}",
+            "-c:a", "aac", "-b:a", audio_bitrate,
+            "-movflags", "+faststart",
+            str(output_path),
+        ])
+    finally:
+        if list_path is not None:
+            list_path.unlink(missing_ok=True)
@@ -1,24 +1,62 @@
 from pathlib import Path
-from moviepy.editor import VideoFileClip, concatenate_videoclips
+
+from backend.video.encode_profiles import write_videofile_options
+from backend.video.ffmpeg_service import concat_copy, probe_video, streams_compatible
+from backend.utils.metrics import stage
+
+
+def probe_videos(input_paths: list[Path]) -> list[dict] | None:
+    """Probe every video, or return None if any of them cannot be probed."""
+    try:
+        return [probe_video(p) for p in input_paths]
+    except (OSError, ValueError):
+        return None
+
+
+def can_stream_copy(input_paths: list[Path]) -> bool:
+    """Check whether the videos can be joined without re-encoding."""
+    probes = probe_videos(input_paths)
+    return probes is not None and streams_compatible(probes)
 
 
 def merge_videos(
     input_paths: list[Path],
     output_path: Path,
+    *,
+    profile: str | None = None,
+    threads: int | None = None,
 ) -> None:
     if len(input_paths) < 2:
         raise ValueError("At least two videos are required")
 
+    # -----------------------------
+    # Fast path: identical codec parameters → container-level concat
+    # -----------------------------
+
+    if can_stream_copy(input_paths):
+        try:
+            concat_copy(input_paths, output_path)
+            return
+        except RuntimeError as e:
+            print(f"Warning: stream copy merge failed, re-encoding: {e}")
+            output_path.unlink(missing_ok=True)
+
+    # -----------------------------
+    # Fallback: decode and re-encode
+    # -----------------------------
+
+    # moviepy is slow to import: only loaded when something is re-encoded
+    from moviepy.editor import VideoFileClip, concatenate_videoclips
+
     clips = [VideoFileClip(str(p)) for p in input_paths]
 
     try:
         final = concatenate_videoclips(clips)
-        final.write_videofile(
-            str(output_path),
-            codec="libx264",
-            audio_codec="aac",
-        )
+        with stage("video.encode"):
+            final.write_videofile(
+                str(output_path),
+                **write_videofile_options(output_path, profile=profile, threads=threads),
+            )
     finally:
         for c in clips:
             c.close()
-
@@ -1,5 +1,34 @@
 from pathlib import Path
-from moviepy.editor import VideoFileClip, AudioFileClip
+
+from backend.video.encode_profiles import get_profile, write_videofile_options
+from backend.video.ffmpeg_service import mux_music_copy
+from backend.video.merge_service import probe_videos
+from backend.utils.metrics import stage
+
+
+def attach_music(
+    clip,
+    music_path: Path,
+    *,
+    music_start: int = 0,
+    volume: float = 1.0,
+):
+    """
+    Replace a clip's audio with a section of the music track.
+
+    Returns (final_clip, audio_clip); the caller closes the audio clip.
+    """
+    # moviepy.editor also adds clip effects such as volumex
+    from moviepy.editor import AudioFileClip
+
+    audio = AudioFileClip(str(music_path))
+    music = audio.subclip(
+        music_start,
+        music_start + clip.duration,
+    )
+
+    music = music.volumex(volume)
+    return clip.set_audio(music), audio
 
 
 def add_music(
@@ -9,23 +38,56 @@ def add_music(
     *,
     music_start: int = 0,
     volume: float = 1.0,
+    profile: str | None = None,
+    threads: int | None = None,
 ) -> None:
 
     if music_start < 0:
         raise ValueError("music_start must be >= 0")
 
-    with VideoFileClip(str(video_path)) as video:
-        audio = AudioFileClip(str(music_path)).subclip(
-            music_start,
-            music_start + video.duration,
-        )
+    settings = get_profile(profile)
 
-        audio = audio.volumex(volume)
-        final = video.set_audio(audio)
+    # -----------------------------
+    # Fast path: copy the video stream, encode only the music
+    # -----------------------------
 
-        final.write_videofile(
-            str(output_path),
-            codec="libx264",
-            audio_codec="aac",
+    probes = probe_videos([video_path])
+    if probes and probes[0]["duration"]:
+        try:
+            mux_music_copy(
+                [video_path],
+                music_path,
+                output_path,
+                duration=probes[0]["duration"],
+                music_start=music_start,
+                volume=volume,
+                audio_bitrate=settings["audio_bitrate"],
+            )
+            return
+        except RuntimeError as e:
+            print(f"Warning: audio-only mux failed, re-encoding: {e}")
+            output_path.unlink(missing_ok=True)
+
+    # -----------------------------
+    # Fallback: decode and re-encode
+    # -----------------------------
+
+    # moviepy is slow to import: only loaded when something is re-encoded
+    from moviepy.editor import VideoFileClip
+
+    with VideoFileClip(str(video_path)) as video:
+        final, audio = attach_music(
+            video,
+            music_path,
+            music_start=music_start,
+            volume=volume,
         )
 
+        try:
+            with stage("video.encode"):
+                final.write_videofile(
+                    str(output_path),
+                    **write_videofile_options(output_path, profile=profile, threads=threads),
+                )
+        finally:
+            audio.close()
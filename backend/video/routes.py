@@ -3,13 +3,14 @@ from flask import (
     request,
     send_file,
     jsonify,
-    after_this_request,
+    current_app,
 )
 from pathlib import Path
 import uuid
 
 from backend.video.video_service import process_video
-from backend.utils.temp_cleanup import cleanup_temp_dir
+from backend.utils.temp_workspace import request_workspace
+from backend.utils.uploads import save_upload, spool_uploads
 
 
 # -----------------------------
@@ -22,14 +23,6 @@ video_bp = Blueprint(
     url_prefix="/api/video-tools"
 )
 
-# -----------------------------
-# Paths
-# -----------------------------
-
-PROJECT_ROOT = Path(__file__).resolve().parents[2]
-TEMP_DIR = PROJECT_ROOT / "temp"
-TEMP_DIR.mkdir(exist_ok=True)
-
 # -----------------------------
 # Limits
 # -----------------------------
@@ -44,6 +37,15 @@ MAX_VIDEOS = 3
 @video_bp.route("/process", methods=["POST"])
 def process_video_route():
 
+    # -----------------------------
+    # Isolated work directory, removed AFTER the response
+    # -----------------------------
+
+    work_dir = request_workspace("video")
+
+    # Uploads are written straight into the work directory
+    spool_uploads(work_dir, "video")
+
     videos = request.files.getlist("videos")
     music = request.files.get("music")
 
@@ -55,22 +57,7 @@ def process_video_route():
 
     music_start = request.form.get("music_start", type=int, default=0)
     volume = request.form.get("volume", type=float, default=1.0)
-
-    # -----------------------------
-    # Create isolated work directory
-    # -----------------------------
-
-    work_dir = TEMP_DIR / f"video_{uuid.uuid4().hex}"
-    work_dir.mkdir(parents=True, exist_ok=True)
-
-    # -----------------------------
-    # Guaranteed cleanup AFTER response
-    # -----------------------------
-
-    @after_this_request
-    def cleanup(response):
-        cleanup_temp_dir(work_dir)
-        return response
+    profile = request.form.get("profile") or current_app.config.get("VIDEO_ENCODE_PROFILE")
 
     try:
         video_paths = []
@@ -82,7 +69,7 @@ def process_video_route():
         for file in videos:
             suffix = Path(file.filename).suffix or ".mp4"
             path = work_dir / f"video_{uuid.uuid4().hex}{suffix}"
-            file.save(path)
+            save_upload(file, path)
             video_paths.append(path)
 
         # -----------------------------
@@ -93,7 +80,7 @@ def process_video_route():
         if music:
             suffix = Path(music.filename).suffix or ".mp3"
             music_path = work_dir / f"music_{uuid.uuid4().hex}{suffix}"
-            music.save(music_path)
+            save_upload(music, music_path)
 
         # -----------------------------
         # Output path
@@ -111,6 +98,8 @@ def process_video_route():
             output_path=output_path,
             music_start=music_start,
             volume=volume,
+            profile=profile,
+            threads=current_app.config.get("VIDEO_THREADS") or None,
         )
 
         # -----------------------------
@@ -124,6 +113,5 @@ def process_video_route():
         )
 
     except Exception as e:
-        cleanup_temp_dir(work_dir)  # safety net
         return jsonify({"error": str(e)}), 400
 
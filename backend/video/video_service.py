@@ -1,6 +1,80 @@
 from pathlib import Path
-from backend.video.merge_service import merge_videos
-from backend.video.music_service import add_music
+
+from backend.video.encode_profiles import get_profile, write_videofile_options
+from backend.video.ffmpeg_service import mux_music_copy, streams_compatible
+from backend.video.merge_service import merge_videos, probe_videos
+from backend.video.music_service import add_music, attach_music
+from backend.utils.metrics import stage
+
+
+def merge_with_music(
+    video_paths: list[Path],
+    music_path: Path,
+    output_path: Path,
+    *,
+    music_start: int = 0,
+    volume: float = 1.0,
+    profile: str | None = None,
+    threads: int | None = None,
+) -> None:
+    """
+    Concatenate several videos and replace their audio with music in one pass.
+
+    Compatible videos are joined by stream copy and only the music is
+    encoded. Otherwise the videos are decoded and encoded exactly once,
+    never to an intermediate file.
+    """
+
+    settings = get_profile(profile)
+
+    # -----------------------------
+    # Fast path: video stream copy, audio-only encode
+    # -----------------------------
+
+    probes = probe_videos(video_paths)
+    if probes and streams_compatible(probes) and all(p["duration"] for p in probes):
+        try:
+            mux_music_copy(
+                video_paths,
+                music_path,
+                output_path,
+                duration=sum(p["duration"] for p in probes),
+                music_start=music_start,
+                volume=volume,
+                audio_bitrate=settings["audio_bitrate"],
+            )
+            return
+        except RuntimeError as e:
+            print(f"Warning: stream copy merge failed, re-encoding: {e}")
+            output_path.unlink(missing_ok=True)
+
+    # -----------------------------
+    # Fallback: a single re-encode
+    # -----------------------------
+
+    # moviepy is slow to import: only loaded when something is re-encoded
+    from moviepy.editor import VideoFileClip, concatenate_videoclips
+
+    clips = [VideoFileClip(str(p)) for p in video_paths]
+    audio = None
+
+    try:
+        final, audio = attach_music(
+            concatenate_videoclips(clips),
+            music_path,
+            music_start=music_start,
+            volume=volume,
+        )
+        with stage("video.encode"):
+            final.write_videofile(
+                str(output_path),
+                **write_videofile_options(output_path, profile=profile, threads=threads),
+            )
+    finally:
+        if audio is not None:
+            audio.close()
+        for c in clips:
+            c.close()
 
 
 def process_video(
@@ -10,27 +84,44 @@ def process_video(
     output_path: Path,
     music_start: int = 0,
     volume: float = 1.0,
+    profile: str | None = None,
+    threads: int | None = None,
 ) -> None:
 
-    temp_video = output_path.with_name("temp_video.mp4")
+    if music_path and music_start < 0:
+        raise ValueError("music_start must be >= 0")
 
-    # 1️⃣ Merge if necessary
-    if len(video_paths) > 1:
-        merge_videos(video_paths, temp_video)
-        base_video = temp_video
-    else:
-        base_video = video_paths[0]
+    # Fail early on an unknown profile, even if no encode turns out to be needed
+    get_profile(profile)
 
-    # 2️⃣ Add music if exists
-    if music_path:
+    # 1️⃣ Merge and add music in a single pass
+    if len(video_paths) > 1 and music_path:
+        merge_with_music(
+            video_paths,
+            music_path,
+            output_path,
+            music_start=music_start,
+            volume=volume,
+            profile=profile,
+            threads=threads,
+        )
+
+    # 2️⃣ Merge only
+    elif len(video_paths) > 1:
+        merge_videos(video_paths, output_path, profile=profile, threads=threads)
+
+    # 3️⃣ Add music only
+    elif music_path:
         add_music(
-            video_path=base_video,
+            video_path=video_paths[0],
             music_path=music_path,
             output_path=output_path,
             music_start=music_start,
             volume=volume,
+            profile=profile,
+            threads=threads,
         )
+
     else:
         # without music
-        base_video.rename(output_path)
-
+        video_paths[0].rename(output_path)
@@ -23,6 +23,8 @@ datas = [
     (str(PROJECT_ROOT / "app" / "templates"), "templates"),
     # static files
     (str(PROJECT_ROOT / "app" / "static"), "static"),
+    # app-level configuration (loaded with app.config.from_pyfile)
+    (str(PROJECT_ROOT / "app" / "config.py"), "."),
     # optional data folder
     (str(PROJECT_ROOT / "data"), "data"),
     # optional temp folder
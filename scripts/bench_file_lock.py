@@ -0,0 +1,165 @@
+# scripts/bench_file_lock.py
+
+"""
+Contention benchmark for backend/utils/file_lock.py.
+
+Compares the kernel-backed FileLock with the previous O_EXCL lock file
+(polling every 100 ms) on three scenarios:
+
+- writers: N processes each increment a counter file M times under the
+  exclusive lock (also checks that no increment was lost)
+- readers: N processes each read the counter M times (shared lock for the
+  new implementation; the old one only had exclusive locks)
+- stale: time to acquire the lock after a holder crashed without
+  releasing it
+
+Usage:
+    python scripts/bench_file_lock.py [--procs 4] [--iterations 50]
+"""
+
+from pathlib import Path
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+
+from backend.utils.file_lock import FileLock
+
+
+class LegacyFileLock:
+    """The lock this benchmark compares against (O_EXCL lock file)."""
+
+    def __init__(self, filepath, timeout=5, delay=0.1, shared=False):
+        self.filepath = filepath + ".lock"
+        self.timeout = timeout
+        self.delay = delay
+
+    def acquire(self):
+        start_time = time.time()
+        while True:
+            try:
+                self.fd = os.open(self.filepath, os.O_CREAT | os.O_EXCL | os.O_RDWR)
+                return
+            except FileExistsError:
+                if (time.time() - start_time) >= self.timeout:
+                    raise TimeoutError(f"Could not acquire lock on {self.filepath}")
+                time.sleep(self.delay)
+
+    def release(self):
+        os.close(self.fd)
+        os.remove(self.filepath)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+IMPLEMENTATIONS = {
+    "legacy": LegacyFileLock,
+    "flock": FileLock,
+}
+
+
+# -----------------------------
+# Workers
+# -----------------------------
+
+def _writer(lock_cls, path, iterations, start):
+    start.wait()
+    for _ in range(iterations):
+        with lock_cls(path, timeout=600):
+            value = int(Path(path).read_text() or 0)
+            Path(path).write_text(str(value + 1))
+
+
+def _reader(lock_cls, path, iterations, start):
+    start.wait()
+    for _ in range(iterations):
+        with lock_cls(path, timeout=600, shared=True):
+            Path(path).read_text()
+            time.sleep(0.001)  # simulate parsing
+
+
+def _run(worker, lock_cls, path, procs, iterations):
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    processes = [
+        ctx.Process(target=worker, args=(lock_cls, path, iterations, start))
+        for _ in range(procs)
+    ]
+    for p in processes:
+        p.start()
+
+    began = time.perf_counter()
+    start.set()
+    for p in processes:
+        p.join()
+    return time.perf_counter() - began
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+
+def bench_writers(lock_cls, tmp, procs, iterations):
+    path = str(tmp / "counter.txt")
+    Path(path).write_text("0")
+    elapsed = _run(_writer, lock_cls, path, procs, iterations)
+    lost = procs * iterations - int(Path(path).read_text())
+    return elapsed, lost
+
+
+def bench_readers(lock_cls, tmp, procs, iterations):
+    path = str(tmp / "counter.txt")
+    Path(path).write_text("0")
+    return _run(_reader, lock_cls, path, procs, iterations)
+
+
+def bench_stale(lock_cls, tmp):
+    """Simulate a crashed holder: the lock file is left behind."""
+    path = str(tmp / "stale.txt")
+    Path(path + ".lock").touch()
+
+    began = time.perf_counter()
+    try:
+        with lock_cls(path, timeout=2):
+            pass
+    except TimeoutError:
+        return None
+    return time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--procs", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    total = args.procs * args.iterations
+    print(f"{args.procs} processes x {args.iterations} iterations")
+    print(f"{'lock':<8}{'writers (ms/op)':>17}{'lost':>6}{'readers (ms/op)':>17}{'stale':>10}")
+
+    for name, lock_cls in IMPLEMENTATIONS.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            write_time, lost = bench_writers(lock_cls, tmp, args.procs, args.iterations)
+            read_time = bench_readers(lock_cls, tmp, args.procs, args.iterations)
+            stale = bench_stale(lock_cls, tmp)
+
+        stale_text = "timeout" if stale is None else f"{stale * 1000:.1f} ms"
+        print(
+            f"{name:<8}{write_time / total * 1000:>17.2f}{lost:>6}"
+            f"{read_time / total * 1000:>17.2f}{stale_text:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# scripts/bench_pdf_pages.py
+
+"""
+Benchmark merge and split of backend/pdf/service.py against page count.
+
+Generates text documents of the given page counts (every page has its
+own content stream, all share one font and one logo image) and reports
+the latency and peak memory (max RSS) of:
+
+- split:   one PDF per page with the previous implementation (a new
+           reader-backed writer per page, input read into memory) versus
+           iter_split_pdf, per page and in parts of --every pages
+- merge:   --inputs copies of the document, previous implementation
+           versus merge_pdfs
+
+Every run happens in a fresh process so peak memory is not shared.
+
+Usage:
+    python scripts/bench_pdf_pages.py [--pages 200,1000,2000] [--every 50] [--inputs 4]
+"""
+
+from pathlib import Path
+import argparse
+import io
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+from backend.pdf.service import iter_split_pdf, merge_pdfs
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+
+def make_document(path: Path, pages: int) -> None:
+    """Write a `pages`-page PDF sharing one font and one logo."""
+    writer = PdfWriter()
+
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+
+    logo = io.BytesIO()
+    Image.linear_gradient("L").convert("RGB").save(logo, format="JPEG", quality=90)
+    image = DecodedStreamObject()
+    image.set_data(logo.getvalue())
+    image.update({
+        NameObject("/Type"): NameObject("/XObject"),
+        NameObject("/Subtype"): NameObject("/Image"),
+        NameObject("/Width"): NumberObject(256),
+        NameObject("/Height"): NumberObject(256),
+        NameObject("/ColorSpace"): NameObject("/DeviceRGB"),
+        NameObject("/BitsPerComponent"): NumberObject(8),
+        NameObject("/Filter"): NameObject("/DCTDecode"),
+    })
+    image = writer._add_object(image)
+
+    for number in range(1, pages + 1):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+            NameObject("/XObject"): DictionaryObject({NameObject("/Logo"): image}),
+        })
+        lines = "".join(
+            f"BT /F1 11 Tf 72 {700 - 14 * i} Td (Page {number}, line {i}: lorem ipsum dolor sit amet) Tj ET\n"
+            for i in range(40)
+        )
+        content = DecodedStreamObject()
+        content.set_data(f"q 64 0 0 64 72 720 cm /Logo Do Q\n{lines}".encode())
+        page[NameObject("/Contents")] = writer._add_object(content.flate_encode())
+
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def legacy_split(input_path: Path, output_dir: Path) -> None:
+    """The split this benchmark compares against."""
+    reader = PdfReader(str(input_path))
+    for i, page in enumerate(reader.pages, start=1):
+        writer = PdfWriter()
+        writer.add_page(page)
+        with open(output_dir / f"{input_path.stem}_page_{i}.pdf", "wb") as f:
+            writer.write(f)
+
+
+def legacy_merge(input_paths: list[Path], output_path: Path) -> None:
+    """The merge this benchmark compares against."""
+    writer = PdfWriter()
+    for path in input_paths:
+        reader = PdfReader(str(path))
+        for page in reader.pages:
+            writer.add_page(page)
+    with open(output_path, "wb") as f:
+        writer.write(f)
+
+
+def _peak_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024
+    return peak / 1024
+
+
+# -----------------------------
+# Cases (each runs in its own process)
+# -----------------------------
+
+def run_case(case: str, input_path: Path, work_dir: Path, every: int, inputs: int, queue) -> None:
+    work_dir.mkdir()
+    start = time.perf_counter()
+
+    if case == "split legacy":
+        legacy_split(input_path, work_dir)
+    elif case == "split":
+        for _ in iter_split_pdf(input_path, work_dir):
+            pass
+    elif case == "split every":
+        for _ in iter_split_pdf(input_path, work_dir, every=every):
+            pass
+    elif case == "merge legacy":
+        legacy_merge([input_path] * inputs, work_dir / "merged.pdf")
+    elif case == "merge":
+        merge_pdfs([input_path] * inputs, work_dir / "merged.pdf")
+
+    elapsed = time.perf_counter() - start
+    output_mb = sum(p.stat().st_size for p in work_dir.iterdir()) / 1024 / 1024
+    queue.put((elapsed, _peak_mb(), output_mb))
+
+
+CASES = ("split legacy", "split", "split every", "merge legacy", "merge")
+
+
+# -----------------------------
+# Entry point
+# -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", default="200,1000,2000")
+    parser.add_argument("--every", type=int, default=50)
+    parser.add_argument("--inputs", type=int, default=4)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+
+    print(f"split every = {args.every} pages, merge of {args.inputs} copies")
+    print(f"{'pages':>6}  {'case':<14}{'time (s)':>10}{'peak RSS (MB)':>16}{'output (MB)':>14}")
+
+    for pages in (int(p) for p in args.pages.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = Path(tmp) / "input.pdf"
+
+            # Built in a child too: Linux children inherit the parent's max RSS
+            proc = ctx.Process(target=make_document, args=(input_path, pages))
+            proc.start()
+            proc.join()
+
+            for n, case in enumerate(CASES):
+                queue = ctx.Queue()
+                proc = ctx.Process(
+                    target=run_case,
+                    args=(case, input_path, Path(tmp) / f"case_{n}", args.every, args.inputs, queue),
+                )
+                proc.start()
+                elapsed, peak_mb, output_mb = queue.get()
+                proc.join()
+                print(f"{pages:>6}  {case:<14}{elapsed:>10.2f}{peak_mb:>16.1f}{output_mb:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
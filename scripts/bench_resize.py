@@ -0,0 +1,98 @@
+# scripts/bench_resize.py
+
+"""
+Benchmark the resize modes of backend/image/resize_service.py.
+
+Generates a large synthetic JPEG, resizes it with every mode and reports
+the average latency and the peak memory (max RSS) of each run. Every mode
+runs in a fresh process so peak memory is not shared between them.
+
+Usage:
+    python scripts/bench_resize.py [--size 6000x4000] [--preset 1280x720] [--runs 5]
+"""
+
+from pathlib import Path
+import argparse
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+
+from PIL import Image, ImageDraw
+
+from backend.image.resize_service import MODES, resize_image
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+
+def make_photo(path: Path, size: tuple[int, int]) -> None:
+    """Write a photo-like JPEG (gradients and shapes, not flat colour)."""
+    width, height = size
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for i in range(0, width, max(width // 40, 1)):
+        draw.ellipse((i, i % height, i + width // 8, i % height + height // 8),
+                     fill=(i % 255, 120, 255 - i % 255))
+    img.save(path, quality=90)
+
+
+def run_mode(mode: str, input_path: Path, output_path: Path, preset: str,
+             runs: int, queue) -> None:
+    start = time.perf_counter()
+    for _ in range(runs):
+        resize_image(input_path, output_path, preset=preset, mode=mode)
+    elapsed = (time.perf_counter() - start) / runs
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024
+    queue.put((elapsed, peak / 1024))
+
+
+# -----------------------------
+# Entry point
+# -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="6000x4000")
+    parser.add_argument("--preset", default="1280x720")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.split("x"))
+    ctx = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / "input.jpg"
+
+        # Built in a child too: Linux children inherit the parent's max RSS
+        proc = ctx.Process(target=make_photo, args=(input_path, size))
+        proc.start()
+        proc.join()
+
+        print(f"Input: {args.size} JPEG, preset {args.preset}, {args.runs} runs")
+        print(f"{'mode':<10}{'latency (ms)':>14}{'peak RSS (MB)':>16}")
+
+        for mode in sorted(MODES, reverse=True):
+            queue = ctx.Queue()
+            proc = ctx.Process(
+                target=run_mode,
+                args=(mode, input_path, Path(tmp) / f"{mode}.jpg",
+                      args.preset, args.runs, queue),
+            )
+            proc.start()
+            elapsed, peak_mb = queue.get()
+            proc.join()
+            print(f"{mode:<10}{elapsed * 1000:>14.1f}{peak_mb:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# scripts/bench_startup.py
+
+"""
+Startup benchmark: time until the app answers its first request.
+
+Starts the app as a fresh process and polls until GET / answers
+(time to first response), then times the first request to a tool route
+(POST /pdf-tools/merge without files: it fails validation, but only
+after the route's libraries are loaded). Both are measured with the
+background warm-up enabled and disabled (WARM_UP in app/config.py).
+
+The source run is `python app/app.py`; pass --exe to also measure a
+frozen build (e.g. dist/app/app from `pyinstaller scripts/app.spec`).
+
+Usage:
+    python scripts/bench_startup.py [--runs 5] [--exe dist/app/app] [--tool-delay 0]
+"""
+
+from pathlib import Path
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+APP_SCRIPT = PROJECT_ROOT / "app" / "app.py"
+
+STARTUP_TIMEOUT = 120
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(url: str, method: str = "GET") -> None:
+    """Send a request; any HTTP status counts as an answer."""
+    req = urllib.request.Request(url, method=method, data=b"" if method == "POST" else None)
+    try:
+        with urllib.request.urlopen(req, timeout=STARTUP_TIMEOUT) as response:
+            response.read()
+    except urllib.error.HTTPError:
+        pass
+
+
+def measure(command: list[str], warm_up: bool, tool_delay: float) -> tuple[float, float]:
+    """Return (time to first response, first tool request) in seconds."""
+    port = free_port()
+    env = dict(
+        os.environ,
+        WORKBENCH_PORT=str(port),
+        WORKBENCH_WARM_UP="1" if warm_up else "0",
+        BROWSER="true",  # app.py opens a browser tab: make that a no-op
+    )
+    base = f"http://127.0.0.1:{port}"
+
+    began = time.perf_counter()
+    proc = subprocess.Popen(command, env=env, cwd=PROJECT_ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                request(f"{base}/")
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if proc.poll() is not None:
+                    raise RuntimeError(f"{command[0]} exited with {proc.returncode}")
+                if time.perf_counter() - began > STARTUP_TIMEOUT:
+                    raise RuntimeError("the app did not answer in time")
+                time.sleep(0.01)
+        first_response = time.perf_counter() - began
+
+        # A user needs a moment to pick a file before using a tool
+        time.sleep(tool_delay)
+        started = time.perf_counter()
+        request(f"{base}/pdf-tools/merge", method="POST")
+        first_tool = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    return first_response, first_tool
+
+
+# -----------------------------
+# Entry point
+# -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--exe", help="frozen build to measure as well")
+    parser.add_argument("--tool-delay", type=float, default=0.0,
+                        help="seconds between the first page and the first tool request")
+    args = parser.parse_args()
+
+    targets = {"source": [sys.executable, str(APP_SCRIPT)]}
+    if args.exe:
+        targets["frozen"] = [str(Path(args.exe).resolve())]
+
+    print(f"{args.runs} runs, medians, tool request {args.tool_delay:.1f} s after the first page")
+    print(f"{'build':<8}{'warm-up':<9}{'first response (ms)':>21}{'first tool request (ms)':>25}")
+
+    for name, command in targets.items():
+        for warm_up in (False, True):
+            results = [measure(command, warm_up, args.tool_delay) for _ in range(args.runs)]
+            first_response = statistics.median(r[0] for r in results)
+            first_tool = statistics.median(r[1] for r in results)
+            print(f"{name:<8}{'on' if warm_up else 'off':<9}"
+                  f"{first_response * 1000:>21.0f}{first_tool * 1000:>25.0f}")
+
+
+if __name__ == "__main__":
+    main()
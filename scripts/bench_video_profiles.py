@@ -0,0 +1,71 @@
+# scripts/bench_video_profiles.py
+
+"""
+Benchmark the video encode profiles of backend/video/encode_profiles.py.
+
+Generates a synthetic reference clip with ffmpeg (moving test pattern and
+a tone), re-encodes it with every profile through moviepy and reports the
+encode time per minute of footage and the resulting file size.
+
+Usage:
+    python scripts/bench_video_profiles.py [--seconds 20] [--size 1280x720] [--clip path.mp4]
+"""
+
+from pathlib import Path
+import argparse
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+
+from moviepy.editor import VideoFileClip
+
+from backend.video.encode_profiles import ENCODE_PROFILES, write_videofile_options
+from backend.video.ffmpeg_service import run_ffmpeg
+
+
+def make_reference_clip(path: Path, seconds: int, size: str) -> None:
+    run_ffmpeg([
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-crf", "10",
+        "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest",
+        str(path),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=20)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--clip", type=Path, help="use this clip instead of a generated one")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        clip_path = args.clip or tmp / "reference.mp4"
+        if not args.clip:
+            make_reference_clip(clip_path, args.seconds, args.size)
+
+        with VideoFileClip(str(clip_path)) as clip:
+            minutes = clip.duration / 60
+            print(f"Reference: {clip.size[0]}x{clip.size[1]}, {clip.duration:.1f} s")
+            print(f"{'profile':<10}{'s / min footage':>17}{'size (MB)':>12}")
+
+            for name in ENCODE_PROFILES:
+                output_path = tmp / f"{name}.mp4"
+                options = write_videofile_options(output_path, profile=name, threads=args.threads)
+
+                start = time.perf_counter()
+                clip.write_videofile(str(output_path), logger=None, **options)
+                elapsed = time.perf_counter() - start
+
+                size_mb = output_path.stat().st_size / (1024 * 1024)
+                print(f"{name:<10}{elapsed / minutes:>17.1f}{size_mb:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
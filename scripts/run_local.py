@@ -0,0 +1,142 @@
+# scripts/run_local.py
+
+"""
+Serve Workbench with a pre-fork WSGI server (gunicorn).
+
+`python app/app.py` runs Flask's development server in one process, so a
+long request (e.g. a video encode) competes with every other request for
+one interpreter. This runner starts SERVER_WORKERS worker processes with
+SERVER_THREADS threads each, so requests are spread over every core.
+
+Settings come from app/config.py (HOST, PORT, SERVER_*,
+MAX_CONTENT_LENGTH) and their WORKBENCH_* environment variables; the
+command-line options below override both.
+
+The master process reacts to (and POST /shutdown, POST /restart send):
+    SIGTERM  graceful shutdown: in-flight requests get
+             SERVER_GRACEFUL_TIMEOUT seconds to finish
+    SIGHUP   graceful restart: new workers start with the current code
+             and config, old ones finish their requests first
+Open /api/todo/events streams don't count as in-flight requests: a
+worker that is told to exit ends them right away (see
+backend/utils/lifecycle.py), and the browsers reconnect to the others.
+
+gunicorn only runs on Unix; without it this falls back to the threaded
+development server.
+
+Usage:
+    python scripts/run_local.py [--host 0.0.0.0] [--port 8000] [--workers 8] [--threads 8]
+"""
+
+from pathlib import Path
+import argparse
+import os
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+
+from flask import Config
+
+CONFIG_FILE = PROJECT_ROOT / "app" / "config.py"
+
+
+def load_config(args) -> Config:
+    config = Config(str(PROJECT_ROOT))
+    config.from_pyfile(str(CONFIG_FILE))
+
+    for name in ("host", "port", "workers", "threads"):
+        value = getattr(args, name)
+        if value is not None:
+            key = name.upper() if name in ("host", "port") else f"SERVER_{name.upper()}"
+            config[key] = value
+            # Workers load app/config.py themselves: pass overrides along
+            os.environ[f"WORKBENCH_{key}"] = str(value)
+
+    return config
+
+
+# -----------------------------
+# Servers
+# -----------------------------
+
+def run_prefork(config: Config) -> None:
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.workers.gthread import ThreadWorker
+
+    from backend.utils.lifecycle import stopping
+
+    class WorkbenchWorker(ThreadWorker):
+        def handle_exit(self, sig, frame):
+            # Graceful exit (SIGTERM, also sent to old workers on SIGHUP):
+            # end the event streams instead of waiting them out
+            stopping.set()
+            super().handle_exit(sig, frame)
+
+    options = {
+        "bind": f"{config['HOST']}:{config['PORT']}",
+        "workers": config["SERVER_WORKERS"],
+        "threads": config["SERVER_THREADS"],
+        "worker_class": WorkbenchWorker,
+        "timeout": config["SERVER_TIMEOUT"],
+        "graceful_timeout": config["SERVER_GRACEFUL_TIMEOUT"],
+        "proc_name": "workbench",
+    }
+
+    class WorkbenchServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Imported in every worker (no preload): nothing is shared
+            # across the fork, and a restart picks up code changes
+            from app.app import create_app, start_warm_up
+            app = create_app()
+            start_warm_up(app)
+            return app
+
+    # Every worker has its own process pool: split the cores between them
+    # unless POOL_WORKERS was set explicitly
+    cores = os.cpu_count() or 1
+    os.environ.setdefault("WORKBENCH_POOL_WORKERS", str(max(1, cores // config["SERVER_WORKERS"])))
+
+    # Lets /shutdown and /restart signal the master instead of one worker
+    os.environ["WORKBENCH_SERVER_PID"] = str(os.getpid())
+
+    WorkbenchServer().run()
+
+
+def run_dev(config: Config) -> None:
+    print("Warning: gunicorn is not available, serving with the single-process development server")
+
+    from app.app import create_app, start_warm_up
+    app = create_app()
+    start_warm_up(app)
+    app.run(host=config["HOST"], port=config["PORT"], debug=False, threaded=True)
+
+
+# -----------------------------
+# Entry point
+# -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads", type=int)
+    args = parser.parse_args()
+
+    config = load_config(args)
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        run_dev(config)
+    else:
+        run_prefork(config)
+
+
+if __name__ == "__main__":
+    main()